@@ -0,0 +1,84 @@
+"""
+permutation-flowshop repository
+
+Evaluate the makespan of many sequences (e.g. a population) in one
+call, with the compiled module or a vectorized numpy fallback.
+"""
+
+import numpy as np
+from problem_instance import get_instance
+
+try:
+    from cysource import calculations
+except ImportError:
+    calculations = None
+
+def evaluate_sequences(instance, sequences, return_completion_times=False, num_threads=1):
+    """Return the makespans (or completion times) of a 2d array of sequences.
+
+    All sequences are evaluated in a single call to the compiled module;
+    when it is not built, the numpy version (wavefront_completion_times)
+    is used instead, with the same results.
+
+    Arguments:
+        instance: ProblemInstance or processing times (numpy 2d array).
+        sequences: Numpy 2d array with one sequence of jobs (numbered
+        from 1) in each row; all sequences have the same length.
+        return_completion_times: Return the completion times instead of the
+        makespans (boolean, default: False).
+        num_threads: Threads for evaluating the sequences (int, default: 1).
+
+    Returns:
+        makespans: Numpy int32 array with the makespan of each sequence, or
+        3d array (sequences x positions x machines) with the completion time
+        of the job at each position on each machine.
+    """
+    instance = get_instance(instance)
+    sequences = np.ascontiguousarray(sequences, dtype='int32')
+    if sequences.ndim != 2:
+        raise ValueError("sequences must be a 2d array with one sequence in each row")
+    if sequences.size and (sequences.min() < 1 or sequences.max() > instance.num_jobs):
+        raise ValueError("jobs must be numbered from 1 to {}".format(instance.num_jobs))
+
+    if calculations is None:
+        completion_times = wavefront_completion_times(instance.processing_times, sequences)
+        if return_completion_times:
+            return completion_times
+        return _makespans(completion_times)
+    return calculations.batch_completion_times(sequences, instance.processing_times, instance.num_machines,
+                                               int(return_completion_times), num_threads)
+
+
+def wavefront_completion_times(processing_times, sequences):
+    """Completion times of many sequences with numpy only.
+
+    The completion time of position i on machine j only depends on
+    (i - 1, j) and (i, j - 1), so all cells of an anti-diagonal (i + j
+    constant) are computed together, for all sequences at once: the loop
+    runs num_jobs + num_machines - 1 times.
+
+    Arguments:
+        processing_times: Numpy 2d array with processing times (jobs x machines).
+        sequences: Numpy 2d array with one sequence in each row.
+
+    Returns:
+        completion_times: Numpy int32 3d array (sequences x positions x machines).
+    """
+    num_sequences, sequence_length = sequences.shape
+    num_machines = processing_times.shape[1]
+    times = processing_times[sequences - 1]
+    # Padded with a zero row and column (before the first position and machine)
+    completion_times = np.zeros((num_sequences, sequence_length + 1, num_machines + 1), dtype='int32')
+    for diagonal in range(sequence_length + num_machines - 1):
+        positions = np.arange(max(0, diagonal - num_machines + 1), min(diagonal, sequence_length - 1) + 1)
+        machines = diagonal - positions
+        start = np.maximum(completion_times[:, positions, machines + 1], completion_times[:, positions + 1, machines])
+        completion_times[:, positions + 1, machines + 1] = start + times[:, positions, machines]
+    return completion_times[:, 1:, 1:]
+
+
+def _makespans(completion_times):
+    """Return the makespan of each sequence from its completion times."""
+    if completion_times.shape[1] == 0:
+        return np.zeros(completion_times.shape[0], dtype='int32')
+    return np.ascontiguousarray(completion_times[:, -1, -1])
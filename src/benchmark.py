@@ -5,9 +5,17 @@ Module to import common benchmark instances used in the
 literature.
 """
 
+import os
 import numpy as np
 
-def import_taillard():
+# Default location of the instance files (relative to this module)
+DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmark instances")
+TAILLARD_DIRECTORY = os.path.join(DIRECTORY, "taillard instances")
+VRF_SMALL_DIRECTORY = os.path.join(DIRECTORY, "vrf instances", "Small")
+VRF_LARGE_DIRECTORY = os.path.join(DIRECTORY, "vrf instances", "Large")
+
+
+def import_taillard(directory=None, cache_file=None):
     """Import Taillard test instances as a two dimensional numpy array.
 
     Instances have from 20 to 120 jobs and from 5 to 20 machines.
@@ -15,23 +23,18 @@ def import_taillard():
     Reference:
         Taillard, E.D. "Benchmarks for basic scheduling problems",
         EJOR vol. 64,pp. 78-285, 1993.
-    """
-    directory = "../benchmark instances/taillard instances/"
-    instances_names = list()
 
-    # Generate instance names
-    for i in range(1, 121):
-        if i < 10:
-            index = "00" + str(i)
-        elif i < 100:
-            index = "0" + str(i)
-        else:
-            index = str(i)
-        instances_names.append("ta" + index)
-    return _import_files(instances_names, directory)
+    Arguments:
+        directory: Path to the instance files (default: TAILLARD_DIRECTORY).
+        cache_file: Path to a .npz cache; it is created if it does not exist
+        and used instead of the text files otherwise. The .npz extension is
+        added if missing, as np.savez does (default: None).
+    """
+    directory = TAILLARD_DIRECTORY if directory is None else directory
+    return _import_set(taillard_names(), directory, False, cache_file)
 
 
-def import_vrf_small():
+def import_vrf_small(directory=None, cache_file=None):
     """Import VRF small test instances as a two dimensional numpy array.
 
     Instances have from 10 to 60 jobs and from 5 to 20 machines.
@@ -39,20 +42,16 @@ def import_vrf_small():
     Reference:
         "New hard benchmark for flowshop scheduling problems minimising makespan",
         EJOR vol. 240, pp. 666-677, 2015.
-    """
-    directory = "../benchmark instances/vrf instances/Small/"
-    instances_names = list()
 
-    # Generate instance names
-    for i in [10,20,30,40,50,60]:
-        for j in [5,10,15,20]:
-            for k in range(1,11):
-                name = "VFR"+str(i)+"_"+str(j)+"_"+str(k)
-                instances_names.append(name)
-    return _import_files(instances_names, directory, vrf= True)
+    Arguments:
+        directory: Path to the instance files (default: VRF_SMALL_DIRECTORY).
+        cache_file: Path to a .npz cache (see import_taillard).
+    """
+    directory = VRF_SMALL_DIRECTORY if directory is None else directory
+    return _import_set(vrf_small_names(), directory, True, cache_file)
 
 
-def import_vrf_large():
+def import_vrf_large(directory=None, cache_file=None):
     """Import VRF large test instances as a two dimensional numpy array.
 
     Instances have from 100 to 800 jobs and from 20 to 60 machines.
@@ -60,17 +59,116 @@ def import_vrf_large():
     Reference:
         "New hard benchmark for flowshop scheduling problems minimising makespan",
         EJOR vol. 240, pp. 666-677, 2015.
+
+    Arguments:
+        directory: Path to the instance files (default: VRF_LARGE_DIRECTORY).
+        cache_file: Path to a .npz cache (see import_taillard).
+    """
+    directory = VRF_LARGE_DIRECTORY if directory is None else directory
+    return _import_set(vrf_large_names(), directory, True, cache_file)
+
+
+def load(name, directory=None, cache_file=None):
+    """Import a single instance by name, e.g. "ta056" or "VFR100_20_1".
+
+    Arguments:
+        name: Instance name (string).
+        directory: Path to the instance file; by default the Taillard,
+        VRF Small or VRF Large directory, according to the name.
+        cache_file: Path to an existing .npz cache with this instance; only
+        this instance is read from it (default: None).
+
+    Returns:
+        instance: 2d numpy array with processing times.
     """
-    directory = "../benchmark instances/vrf instances/Large/"
+    cache_file = _cache_file_name(cache_file)
+    if cache_file is not None and os.path.exists(cache_file):
+        with np.load(cache_file) as data:
+            if name in data.files:
+                return data[name]
+
+    vrf = name.startswith("VFR")
+    if directory is None:
+        if not vrf:
+            directory = TAILLARD_DIRECTORY
+        elif int(name[3:].split("_")[0]) <= 60:
+            directory = VRF_SMALL_DIRECTORY
+        else:
+            directory = VRF_LARGE_DIRECTORY
+    return read_instance(_file_name(name, directory, vrf))
+
+
+def read_instance(file_name):
+    """Read an instance file as a two dimensional numpy array.
+
+    The first line has the number of jobs and machines, and each following
+    line has pairs of machine index and processing time for one job.
+    """
+    with open(file_name, "r") as f:
+        num_jobs, num_machines = (int(item) for item in f.readline().split()[:2])
+        values = np.loadtxt(f, dtype='int32', ndmin=2)
+    # Keep every other integer (processing times)
+    instance = np.ascontiguousarray(values[:, 1::2])
+    if instance.shape != (num_jobs, num_machines):
+        raise ValueError("{}: expected {} jobs and {} machines, found shape {}".format(
+            file_name, num_jobs, num_machines, instance.shape))
+    return instance
+
+
+def taillard_names():
+    """Return the names of the Taillard instances (same order as import_taillard)."""
+    instances_names = list()
+    for i in range(1, 121):
+        if i < 10:
+            index = "00" + str(i)
+        elif i < 100:
+            index = "0" + str(i)
+        else:
+            index = str(i)
+        instances_names.append("ta" + index)
+    return instances_names
+
+
+def vrf_small_names():
+    """Return the names of the VRF small instances (same order as import_vrf_small)."""
     instances_names = list()
+    for i in [10,20,30,40,50,60]:
+        for j in [5,10,15,20]:
+            for k in range(1,11):
+                name = "VFR"+str(i)+"_"+str(j)+"_"+str(k)
+                instances_names.append(name)
+    return instances_names
+
 
-    # Generate instance names
+def vrf_large_names():
+    """Return the names of the VRF large instances (same order as import_vrf_large)."""
+    instances_names = list()
     for i in [100,200,300,400,500,600,700,800]:
         for j in [20,40,60]:
             for k in range(1, 11):
                 name = "VFR" + str(i) + "_" + str(j) + "_" + str(k)
                 instances_names.append(name)
-    return _import_files(instances_names, directory, vrf= True)
+    return instances_names
+
+
+def _import_set(instances_names, directory, vrf, cache_file):
+    """Import a set of instances from the .npz cache or from the text files."""
+    cache_file = _cache_file_name(cache_file)
+    if cache_file is not None and os.path.exists(cache_file):
+        with np.load(cache_file) as data:
+            return [data[name] for name in instances_names]
+
+    instances = _import_files(instances_names, directory, vrf)
+    if cache_file is not None:
+        np.savez(cache_file, **dict(zip(instances_names, instances)))
+    return instances
+
+
+def _cache_file_name(cache_file):
+    """Return the cache path with the .npz extension that np.savez adds to it."""
+    if cache_file is None or str(cache_file).endswith('.npz'):
+        return cache_file
+    return str(cache_file) + '.npz'
 
 
 def _import_files(instances_names, directory, vrf=False):
@@ -84,31 +182,13 @@ def _import_files(instances_names, directory, vrf=False):
     Returns:
         instances: List with each instance as 2d numpy array.
     """
-    instances = list()
-    instance = list()
+    return [read_instance(_file_name(name, directory, vrf)) for name in instances_names]
 
-    # Read files - each file is an instance
-    for _, instance_name in enumerate(instances_names):
-        if vrf:
-            file_name_extension = "_Gap.txt"
-        else:
-            file_name_extension = ""
-        # Open file and jump first line
-        f = open(directory + instance_name + file_name_extension, "r")
-        f.readline()
-        # Reset variables for each instance
-        instance.clear()
-        job_num = 0
-        i = 0
-        for line in f.readlines():
-            instance.append(list())
-
-            for item in line.split():
-                if item != " " and item != "\n":
-                    i += 1
-                    if i % 2 == 0:
-                        instance[job_num].append(int(item))
-            job_num += 1
-        # Create numpy 2d array for each instance and append to instances list
-        instances.append(np.array(instance.copy(), dtype='int32'))
-    return instances
+
+def _file_name(instance_name, directory, vrf):
+    """Return the path to the file of an instance."""
+    if vrf:
+        file_name_extension = "_Gap.txt"
+    else:
+        file_name_extension = ""
+    return os.path.join(directory, instance_name + file_name_extension)
@@ -0,0 +1,164 @@
+"""
+permutation-flowshop repository
+
+Run Iterated Greedy variants over the benchmark instances and record
+solution quality and throughput. Example (from the src directory):
+
+    python benchmark_runner.py taillard --first 10 --seeds 1 2 3 --workers 4
+        --variants '{"tb": {"tie_breaking": true}}' --output results.csv
+"""
+
+import argparse
+import csv
+import json
+import benchmark
+from iterated_greedy import computational_time
+from parallel_iterated_greedy import solve_batch
+from problem_instance import ProblemInstance
+
+INSTANCE_SETS = {
+    'taillard': (benchmark.import_taillard, benchmark.taillard_names),
+    'vrf_small': (benchmark.import_vrf_small, benchmark.vrf_small_names),
+    'vrf_large': (benchmark.import_vrf_large, benchmark.vrf_large_names),
+}
+
+FIELDS = ['instance', 'num_jobs', 'num_machines', 'variant', 'seed', 'runtime_ms', 'makespan',
+          'upper_bound', 'rpd', 'iterations', 'evaluations', 'elapsed_seconds',
+          'iterations_per_second', 'evaluations_per_second']
+
+
+def run_benchmark(instances, names, variants, seeds, runtime_parameter=30,
+                  runtime_in_miliseconds=None, max_iterations=None, upper_bounds=None, workers=1):
+    """Run each variant with each seed on each instance.
+
+    Arguments:
+        instances: List with processing times (2d numpy arrays).
+        names: List with the name of each instance.
+        variants: Dict with variant name -> dict of IteratedGreedy attributes.
+        seeds: List with the seeds for random and numpy generators.
+        runtime_parameter: Parameter for IteratedGreedy.computational_time (int, default: 30).
+        runtime_in_miliseconds: Fixed runtime that replaces the literature
+        time limit; None to use computational_time (default: None).
+        max_iterations: Also stop after this number of iterations, replacing
+        the limit of the variants; None keeps their own (int, default: None).
+        upper_bounds: Dict with instance name -> best known makespan (default: None).
+        workers: Number of processes running the runs (see solve_batch); 1 runs
+        them in this process and None uses all cores (int, default: 1).
+
+    Returns:
+        results: List with a dict (see FIELDS) for each run.
+    """
+    upper_bounds = upper_bounds if upper_bounds else dict()
+    tasks = list()
+    for name, processing_times in zip(names, instances):
+        instance = ProblemInstance(processing_times)
+        for variant, configuration in variants.items():
+            if max_iterations is not None:
+                configuration = dict(configuration, max_iterations=max_iterations)
+            for seed in seeds:
+                tasks.append((name, instance, variant, seed, configuration))
+
+    if runtime_in_miliseconds is None:
+        runtimes = [computational_time(task[1].num_jobs, task[1].num_machines, runtime_parameter)
+                    for task in tasks]
+    else:
+        runtimes = [runtime_in_miliseconds] * len(tasks)
+
+    results = [None] * len(tasks)
+    batch = solve_batch([task[1] for task in tasks], runtimes, workers=workers,
+                        seeds=[task[3] for task in tasks], configurations=[task[4] for task in tasks])
+    for run in batch:
+        name, instance, variant, seed, _ = tasks[run['index']]
+        makespan = run['makespan']
+        elapsed = run['elapsed_seconds']
+        upper_bound = upper_bounds.get(name)
+        results[run['index']] = {
+            'instance': name,
+            'num_jobs': instance.num_jobs,
+            'num_machines': instance.num_machines,
+            'variant': variant,
+            'seed': seed,
+            'runtime_ms': run['runtime_ms'],
+            'makespan': makespan,
+            'upper_bound': upper_bound,
+            'rpd': None if upper_bound is None else 100 * (makespan - upper_bound) / upper_bound,
+            'iterations': run['iterations'],
+            'evaluations': run['evaluations'],
+            'elapsed_seconds': elapsed,
+            'iterations_per_second': run['iterations'] / elapsed,
+            'evaluations_per_second': run['evaluations'] / elapsed,
+        }
+    return results
+
+
+def read_upper_bounds(file_name):
+    """Read a csv file with instance name and upper bound on each line."""
+    upper_bounds = dict()
+    with open(file_name, newline='') as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and row[1].strip().isdigit():
+                upper_bounds[row[0].strip()] = int(row[1])
+    return upper_bounds
+
+
+def write_results(results, file_name):
+    """Write results to a json file (.json extension) or csv file (other extensions)."""
+    with open(file_name, 'w', newline='') as f:
+        if file_name.endswith('.json'):
+            json.dump(results, f, indent=2)
+        else:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark Iterated Greedy variants.")
+    parser.add_argument('instance_set', choices=sorted(INSTANCE_SETS))
+    parser.add_argument('--first', type=int, default=None, help="use only the first N instances")
+    parser.add_argument('--names', nargs='+', default=None, help="use only these instances")
+    parser.add_argument('--variants', default='{"default": {}}',
+                        help="json (or json file) with variant name -> IteratedGreedy attributes")
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0])
+    parser.add_argument('--runtime-parameter', type=int, default=30,
+                        help="parameter for the literature time limit (n * m / 2 * parameter ms)")
+    parser.add_argument('--runtime', type=float, default=None, help="fixed runtime in miliseconds")
+    parser.add_argument('--max-iterations', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of processes running the runs (0 for all cores)")
+    parser.add_argument('--cache-file', default=None, help="npz cache for the instance set")
+    parser.add_argument('--upper-bounds', default=None, help="csv file with instance name, upper bound")
+    parser.add_argument('--output', default='benchmark_results.csv', help="csv or json output file")
+    args = parser.parse_args(argv)
+
+    import_function, names_function = INSTANCE_SETS[args.instance_set]
+    names = names_function()
+    instances = import_function(cache_file=args.cache_file)
+    if args.names is not None:
+        selected = [i for i, name in enumerate(names) if name in args.names]
+        names = [names[i] for i in selected]
+        instances = [instances[i] for i in selected]
+    if args.first is not None:
+        names = names[:args.first]
+        instances = instances[:args.first]
+
+    if args.variants.strip().startswith('{'):
+        variants = json.loads(args.variants)
+    else:
+        with open(args.variants) as f:
+            variants = json.load(f)
+    upper_bounds = read_upper_bounds(args.upper_bounds) if args.upper_bounds else None
+
+    results = run_benchmark(instances, names, variants, args.seeds, args.runtime_parameter,
+                            args.runtime, args.max_iterations, upper_bounds,
+                            args.workers if args.workers > 0 else None)
+    write_results(results, args.output)
+
+    for result in results:
+        print("{instance} {variant} seed={seed} makespan={makespan} rpd={rpd} "
+              "it/s={iterations_per_second:.1f} ev/s={evaluations_per_second:.0f}".format(**result))
+
+
+if __name__ == "__main__":
+    main()
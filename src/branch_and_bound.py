@@ -0,0 +1,177 @@
+"""
+permutation-flowshop repository
+
+Exact branch and bound for the makespan of small instances, with an
+Iterated Greedy incumbent and machine based lower bounds.
+"""
+
+import math
+import time
+import numpy as np
+import constructive_heuristic
+from cysource import calculations
+from iterated_greedy import IteratedGreedy
+from problem_instance import get_instance
+from solution import Solution
+
+# Nodes explored by the compiled search between clock checks
+CLOCK_CHECK_NODES = 100000
+
+class BranchAndBound(object):
+    """Depth first branch and bound for the permutation flowshop (makespan).
+
+    Nodes are partial sequences extended at the end. The bound of a node
+    is the largest machine bound: completion time of the partial sequence on
+    the machine, plus the load of the unscheduled jobs on it, plus the
+    smallest time an unscheduled job needs on the following machines. The
+    children of a node are explored in order of bound and the ones that
+    cannot improve the incumbent are pruned. The search runs in the compiled
+    module (calculations.branch_and_bound) in chunks of CLOCK_CHECK_NODES
+    nodes, checking the limits between chunks.
+
+    The incumbent comes from Iterated Greedy (NEH and local search first),
+    or from a given sequence to certify it. The search stops early at the
+    time or node limit; the lower bound is then the smallest bound of the
+    unexplored nodes (at least the instance lower bound) and gap reports
+    how far the incumbent can be from the optimum.
+
+    Attributes:
+        instance: ProblemInstance with the processing times.
+        time_limit: Time limit of the search in miliseconds, not counting the
+        incumbent (default: None).
+        node_limit: Maximum number of nodes (int, default: None).
+        incumbent_runtime: Runtime of Iterated Greedy for the incumbent in
+        miliseconds; zero to use only NEH (default: 100).
+        best_solution: Solution with the best sequence found.
+        lower_bound: Proven lower bound on the optimal makespan (int).
+        optimal: The best solution is proven optimal (boolean).
+        nodes: Number of nodes explored (int).
+        elapsed_seconds: Duration of the search (float).
+
+    Example:
+        bb = BranchAndBound(processing_times)
+        bb.time_limit = 10000
+        bb.solve()
+        print(bb.best_solution.makespan, bb.lower_bound, bb.gap)
+    """
+
+    def __init__(self, instance):
+        self.instance = get_instance(instance)
+        self.time_limit = None
+        self.node_limit = None
+        self.incumbent_runtime = 100
+        self.best_solution = Solution(self.instance)
+        self.lower_bound = 0
+        self.optimal = False
+        self.nodes = 0
+        self.elapsed_seconds = 0.0
+
+        # Time of each job on the machines after each machine
+        times = self.instance.processing_times
+        self._tails = np.ascontiguousarray(np.cumsum(times[:, ::-1], axis=1)[:, ::-1] - times, dtype='int32')
+
+    @property
+    def gap(self):
+        """Relative gap between the best makespan and the lower bound in percent (float)."""
+        upper_bound = self.best_solution.makespan
+        if upper_bound == 0:
+            return 0.0
+        return 100 * (upper_bound - self.lower_bound) / upper_bound
+
+    def solve(self, initial_sequence=None):
+        """Search for an optimal sequence.
+
+        Arguments:
+            initial_sequence: Incumbent sequence (all jobs), e.g. an Iterated
+            Greedy result to certify; None to run Iterated Greedy (default: None).
+
+        Returns:
+            optimal: The best solution is proven optimal (boolean).
+        """
+        self._initial_incumbent(initial_sequence)
+        start_ns = time.perf_counter_ns()
+        self.nodes = 0
+
+        num_jobs, num_machines = self.instance.num_jobs, self.instance.num_machines
+        upper_bound = int(self.best_solution.makespan)
+        lower_bound = self.instance.lower_bound
+        if upper_bound > lower_bound:
+            completion = np.zeros((num_jobs + 1, num_machines), dtype='int32')
+            children = np.zeros((num_jobs, num_jobs), dtype='int32')
+            bounds = np.zeros((num_jobs, num_jobs), dtype='int32')
+            levels = np.zeros((4, num_jobs), dtype='int32')
+            levels[0] = -1
+            machines = np.zeros((4, num_machines), dtype='int32')
+            machines[0] = self.instance.machine_loads
+            best_sequence = self.best_solution.sequence.copy()
+            state = np.array([0, upper_bound, lower_bound, 0], dtype='int32')
+
+            while not state[3]:
+                node_limit = CLOCK_CHECK_NODES
+                if self.node_limit is not None:
+                    node_limit = min(node_limit, self.node_limit - self.nodes)
+                if node_limit <= 0 or self._time_exceeded(start_ns):
+                    break
+                self.nodes += calculations.branch_and_bound(
+                    self.instance.processing_times, self._tails, num_jobs, num_machines, completion,
+                    children, bounds, levels, machines, best_sequence, state, node_limit)
+
+            if state[1] < upper_bound:
+                upper_bound = int(state[1])
+                self.best_solution.sequence = best_sequence
+                self.best_solution.makespan = upper_bound
+            if not state[3]:
+                lower_bound = max(lower_bound, min(upper_bound, _unexplored_bound(state[0], bounds, levels)))
+            else:
+                lower_bound = upper_bound
+
+        self.lower_bound = int(min(lower_bound, upper_bound))
+        self.optimal = self.lower_bound == upper_bound
+        self.elapsed_seconds = (time.perf_counter_ns() - start_ns) / 1e9
+        return self.optimal
+
+    def _initial_incumbent(self, initial_sequence):
+        """Set the best solution to the given sequence, Iterated Greedy or NEH."""
+        if initial_sequence is not None:
+            initial_sequence = np.asarray(initial_sequence, dtype='int32')
+            if not np.array_equal(np.sort(initial_sequence), np.arange(1, self.instance.num_jobs + 1)):
+                raise ValueError("the initial sequence must have each job exactly once")
+            self.best_solution.sequence = initial_sequence
+            self.best_solution.calculate_makespan()
+        elif self.incumbent_runtime:
+            ig = IteratedGreedy(self.instance)
+            ig.target_makespan = self.instance.lower_bound
+            ig.run(self.incumbent_runtime)
+            self.best_solution.sequence = ig.best_solution.sequence
+            self.best_solution.makespan = ig.best_solution.makespan
+        else:
+            constructive_heuristic.NEH(self.best_solution, order_jobs=0)
+
+    def _time_exceeded(self, start_ns):
+        """Return True if the time limit of the search is over."""
+        if self.time_limit is None:
+            return False
+        return time.perf_counter_ns() - start_ns >= self.time_limit * 1000000
+
+
+def _unexplored_bound(depth, bounds, levels):
+    """Return the smallest bound of the nodes not explored when the search stopped.
+
+    At each depth above the current node the unexplored children follow
+    the one on the current path; at the current depth they start at the next
+    child, or are the node itself if it was not expanded. Children are sorted
+    by bound, so only the first unexplored child of each depth is needed.
+    """
+    unexplored_bound = math.inf
+    for d in range(depth + 1):
+        count, position = levels[0, d], levels[1, d]
+        if d < depth:
+            position += 1
+        elif count < 0:
+            if d == 0:
+                return 0
+            unexplored_bound = min(unexplored_bound, bounds[d - 1, levels[1, d - 1]])
+            continue
+        if position < count:
+            unexplored_bound = min(unexplored_bound, bounds[d, position])
+    return unexplored_bound
@@ -12,7 +12,7 @@ def NEH(solution, tie_breaking=False, order_jobs="SD"):
     """Create initial solution with NEH heuristic.
 
     Apply the Nawaz, Enscore and Hans heuristic (1983) to the
-    solution object argument.
+    solution object argument, minimizing the solution objective.
 
     Arguments:
         solution: Solution object.
@@ -32,31 +32,25 @@ def NEH(solution, tie_breaking=False, order_jobs="SD"):
         random.shuffle(sorted_jobs)
     # Take the first two jobs and schedule them in order to minimize the partial makespan
     solution.sequence = [sorted_jobs[0],sorted_jobs[1]]
-    makespan1 = solution.calculate_makespan()
+    makespan1 = solution.calculate_objective()
     solution.sequence = [sorted_jobs[1], sorted_jobs[0]]
-    if makespan1 < solution.calculate_makespan():
+    if makespan1 < solution.calculate_objective():
         solution.sequence = [sorted_jobs[0],sorted_jobs[1]]
-        solution.makespan = makespan1
+        solution.calculate_objective()
     # For i = 3 to n: Insert the i-th job at the place, among
-    # the i possible ones, which minimize the partial makespan
+    # the i possible ones, which minimize the partial makespan (objective)
     for job in sorted_jobs[2:]:
         solution.insert_best_position(job, tie_breaking)
 
 
 def _sd_order(solution):
     """Order jobs by non decreasing sum of the processing times."""
-    total_processing_times = dict()
-    for i in range(1, solution.num_jobs + 1):
-        total_processing_times[i] = np.sum(solution.processing_times[i-1])
-
-    return sorted(total_processing_times, key=total_processing_times.get, reverse=True)
+    total_processing_times = solution.instance.total_processing_times
+    return (np.argsort(-total_processing_times, kind='stable') + 1).tolist()
 
 
 def _ad_order(solution):
     """Order jobs by non-decreasing sum of the mean and deviation (Huang and Chen, 2008)."""
-    average_plus_deviation = dict()
-    for i in range(1, solution.num_jobs + 1):
-        avg = np.mean(solution.processing_times[i-1])
-        dev = np.std(solution.processing_times[i-1])
-        average_plus_deviation[i] = avg + dev
-    return sorted(average_plus_deviation, key=average_plus_deviation.get, reverse=True)
\ No newline at end of file
+    instance = solution.instance
+    average_plus_deviation = instance.mean_processing_times + instance.std_processing_times
+    return (np.argsort(-average_plus_deviation, kind='stable') + 1).tolist()
\ No newline at end of file
@@ -7,101 +7,272 @@ Cython implementation of computationally expensive functions.
 
 from numpy import zeros
 cimport cython
+from cython.parallel cimport prange
+from libc.limits cimport INT_MAX
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-cpdef taillard_acceleration(int[:] sequence, int[:,:] processing_times, int inserting_job, int num_machines, int use_tie_breaking):
+cpdef taillard_acceleration(int[:] sequence, const int[:,:] processing_times, int inserting_job, int num_machines,
+							int use_tie_breaking, int[:,:,::1] workspace, int[::1] ms,
+							int valid_heads, int valid_tails, int num_threads=1, int prune=0):
 	"""Find the best position to insert a job (lowest makespan time).
 
 	Reference:
 	"Some efficient heuristic methods for the flow shop sequencing problem",
 	Taillard, E., EJOR 47 (1990), p65-74.
 
+	The heads (e) and tails (q) matrices are kept in the workspace between
+	calls. Tails are stored from the last job backwards (row k holds the tail
+	of the last k jobs), so rows that are still valid after a job is removed
+	or inserted do not move and only the remaining rows are recomputed.
+
+	The calculations run without the GIL. With num_threads > 1 the makespan
+	of each insertion position is computed in parallel (OpenMP). With prune > 0
+	(and one thread) positions are abandoned once their partial makespan
+	exceeds the best makespan found so far; the result is the same.
+
 	Arguments:
 		sequence: Numpy array with current solution (job sequence).
 		processing_times: Numpy 2d array with processing times.
 		inserting_job: Job to insert (int)
 		num_machines: Number of machines in this problem (int).
 		use_tie_breaking: Use tie breaking mechanism (int, 1 or 0)
+		workspace: Numpy 3d array with shape (4, num_jobs + 2, num_machines + 2)
+		that holds the e, q, f and fl matrices. Allocated once by the caller
+		and reused between calls, so there is no limit on the instance size.
+		ms: Numpy array with at least num_jobs + 2 elements (makespan per position).
+		valid_heads: Number of leading rows of e that are valid for sequence (int).
+		valid_tails: Number of trailing jobs whose rows of q are valid (int).
+		num_threads: Threads for evaluating the positions (int, default: 1).
+		prune: Abandon dominated positions early (int, 1 or 0, default: 0).
 
 	Returns:
 		best_position: Index for position with min makespan.
 		best_makespan: Makespan after inserting the job
 	"""
-	# Static C arrays - fastest option, but be carefull 
-	# since this is allocated on the stack
-	cdef int e[801][61]
-	cdef int q[801][61]
-	cdef int f[801][61]
-	cdef int ms[801]
 	cdef int sequence_length, best_makespan, best_position
-	cdef int i, j, iq, jq, tmp
 
-	# Initialize some values
 	sequence_length = len(sequence)
-	iq = sequence_length + 1
+	if (workspace.shape[0] < 4 or workspace.shape[1] < sequence_length + 2
+			or workspace.shape[2] < num_machines + 2 or ms.shape[0] < sequence_length + 2):
+		raise ValueError("workspace is too small for this sequence")
 
-	# Main Loop
-	for i in range(1, sequence_length + 2):
-		if i < sequence_length + 1:
-			e[i][0] = 0
+	# Views on the preallocated workspace
+	cdef int[:,::1] e = workspace[0]
+	cdef int[:,::1] q = workspace[1]
+	cdef int[:,::1] f = workspace[2]
+	cdef int[:,::1] fl = workspace[3]
 
-			# Q index I
-			iq = iq - 1
-			q[iq][num_machines + 1] = 0
+	with nogil:
+		best_position = _best_insertion(sequence, processing_times, inserting_job, num_machines,
+										use_tie_breaking, e, q, f, fl, ms, valid_heads, valid_tails,
+										num_threads, prune)
+		best_makespan = ms[best_position]
+	return best_position, best_makespan
 
-		f[i][0] = 0
-		jq = num_machines + 1
-	
-		for j in range(1, num_machines + 1):
-			if i == 1:
-				e[0][j] = 0
-				q[sequence_length + 1][num_machines + 1 - j] = 0
-			if i < sequence_length + 1:
-				# Q Index J
-				jq = jq - 1
-
-				if e[i][j - 1] > e[i - 1][j]:
-					e[i][j] = e[i][j - 1] + processing_times[sequence[i - 1]-1, j-1]
-				else:
-					e[i][j] = e[i - 1][j] + processing_times[sequence[i - 1]-1, j-1]
 
-				if q[iq][jq + 1] > q[iq + 1][jq]:
-					q[iq][jq] = q[iq][jq + 1] + processing_times[sequence[iq - 1]-1, jq-1]
-				else:
-					q[iq][jq] = q[iq + 1][jq] + processing_times[sequence[iq - 1]-1, jq-1]
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _best_insertion(int[:] sequence, const int[:,:] processing_times, int inserting_job, int num_machines,
+						 int use_tie_breaking, int[:,::1] e, int[:,::1] q, int[:,::1] f, int[:,::1] fl,
+						 int[::1] ms, int valid_heads, int valid_tails, int num_threads, int prune) noexcept nogil:
+	"""Return the best position to insert the job (see taillard_acceleration)."""
+	cdef int sequence_length, best_position, i
+	sequence_length = sequence.shape[0]
 
-			# f(ij) = max {f(i, j-1), e(i-1, j)}
-			if f[i][j - 1] > e[i - 1][j]:
-				f[i][j] = f[i][j - 1] + processing_times[inserting_job - 1, j-1]
-			else:
-				f[i][j] = e[i - 1][j] + processing_times[inserting_job - 1, j-1]
+	# Recompute only the heads and tails that were invalidated
+	_update_heads(sequence, processing_times, num_machines, e, valid_heads)
+	_update_tails(sequence, processing_times, num_machines, q, valid_tails)
 
-    # Makespam - job k in position i
-    # Also save the first position with the optimal makespan
-	best_makespan = 0
-	best_position = 0
-	for i in range(1, sequence_length + 2):
-		ms[i] = 0
-		for j in range(1, num_machines + 1):
-			tmp = f[i][j] +	q[i][j]
-			if tmp > ms[i]:
-				ms[i] = tmp
-	    # Check best insertion position
-		if ms[i] < best_makespan or best_makespan == 0:
-			best_makespan = ms[i]
+	# Makespam - job k in position i
+	# Also save the first position with the optimal makespan
+	_insertion_makespans(processing_times, e, q, f, ms, inserting_job, sequence_length,
+						 num_machines, num_threads, prune)
+	best_position = 1
+	for i in range(2, sequence_length + 2):
+		if ms[i] < ms[best_position]:
 			best_position = i
 
 	# Use tie breaking mechanism (TBFF)
 	if use_tie_breaking > 0:
-		best_position = tie_breaking(processing_times, e, f, ms, inserting_job, best_position, sequence_length, num_machines)
-	return best_position, best_makespan
+		best_position = tie_breaking(sequence, processing_times, e, f, fl, ms, inserting_job, best_position, sequence_length, num_machines)
+	return best_position
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef insertion_makespans(int[:] sequence, const int[:,:] processing_times, int[:] jobs, int num_machines,
+						  int[:,:,::1] workspace, int valid_heads, int valid_tails, int num_threads=1):
+	"""Makespan of inserting each candidate job in each position of the sequence.
+
+	Heads and tails are computed once and shared by all candidates, so this
+	is much cheaper than one taillard_acceleration call per job.
+
+	Arguments:
+		sequence: Numpy array with current solution (job sequence).
+		processing_times: Numpy 2d array with processing times.
+		jobs: Numpy array with the candidate jobs (not in the sequence).
+		num_machines: Number of machines in this problem (int).
+		workspace: Numpy 3d array used by taillard_acceleration.
+		valid_heads: Number of leading rows of e that are valid for sequence (int).
+		valid_tails: Number of trailing jobs whose rows of q are valid (int).
+		num_threads: Threads for evaluating the positions (int, default: 1).
+
+	Returns:
+		makespans: Numpy 2d array with shape (len(jobs), len(sequence) + 1), where
+		element [k, i] is the makespan with jobs[k] inserted at index i.
+	"""
+	cdef int sequence_length, num_jobs, k
+	sequence_length = len(sequence)
+	num_jobs = len(jobs)
+	if (workspace.shape[0] < 4 or workspace.shape[1] < sequence_length + 2
+			or workspace.shape[2] < num_machines + 2):
+		raise ValueError("workspace is too small for this sequence")
+
+	cdef int[:,::1] e = workspace[0]
+	cdef int[:,::1] q = workspace[1]
+	cdef int[:,::1] f = workspace[2]
+	# Column 0 is not used (positions start at 1)
+	makespans = zeros((num_jobs, sequence_length + 2), dtype='int32')
+	cdef int[:,::1] ms = makespans
+
+	with nogil:
+		_update_heads(sequence, processing_times, num_machines, e, valid_heads)
+		_update_tails(sequence, processing_times, num_machines, q, valid_tails)
+		for k in range(num_jobs):
+			_insertion_makespans(processing_times, e, q, f, ms[k], jobs[k], sequence_length,
+								 num_machines, num_threads, 0)
+	return makespans[:, 1:]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _insertion_makespans(const int[:,:] processing_times, int[:,::1] e, int[:,::1] q, int[:,::1] f,
+							   int[::1] ms, int inserting_job, int sequence_length, int num_machines,
+							   int num_threads, int prune) noexcept nogil:
+	"""Compute f and the makespan (ms) of inserting the job in each position.
+
+	With prune > 0 (single thread only) a position is abandoned as soon as its
+	partial makespan exceeds the best makespan of the previous positions; its
+	ms is then only a value greater than the best makespan.
+	"""
+	cdef int i, best_makespan
+	if num_threads > 1:
+		for i in prange(1, sequence_length + 2, num_threads=num_threads, schedule='static'):
+			_position_makespan(processing_times, e, q, f, ms, inserting_job, i, sequence_length, num_machines, 0)
+	elif prune > 0:
+		best_makespan = 0
+		for i in range(1, sequence_length + 2):
+			_position_makespan(processing_times, e, q, f, ms, inserting_job, i, sequence_length,
+							   num_machines, best_makespan)
+			if ms[i] < best_makespan or best_makespan == 0:
+				best_makespan = ms[i]
+	else:
+		for i in range(1, sequence_length + 2):
+			_position_makespan(processing_times, e, q, f, ms, inserting_job, i, sequence_length, num_machines, 0)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline void _position_makespan(const int[:,:] processing_times, int[:,::1] e, int[:,::1] q, int[:,::1] f,
+									int[::1] ms, int inserting_job, int i, int sequence_length,
+									int num_machines, int bound) noexcept nogil:
+	"""Compute row i of f and the makespan with the job inserted in position i.
+
+	If bound > 0, stop as soon as the partial makespan is greater than bound.
+	"""
+	cdef int j, tmp
+	# Tail row for the jobs after position i
+	cdef int iq = sequence_length + 1 - i
+
+	f[i, 0] = 0
+	ms[i] = 0
+	for j in range(1, num_machines + 1):
+		# f(ij) = max {f(i, j-1), e(i-1, j)}
+		if f[i, j - 1] > e[i - 1, j]:
+			f[i, j] = f[i, j - 1] + processing_times[inserting_job - 1, j-1]
+		else:
+			f[i, j] = e[i - 1, j] + processing_times[inserting_job - 1, j-1]
+
+		tmp = f[i, j] + q[iq, j]
+		if tmp > ms[i]:
+			ms[i] = tmp
+			if bound > 0 and tmp > bound:
+				return
 
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-cdef tie_breaking(int[:,:] processing_times, int[:,:] e, int[:,:] f, int[:] ms,
-				  int inserting_job, int best_position, int sequence_length, int num_machines):
+cpdef int calculate_heads(int[:] sequence, const int[:,:] processing_times, int num_machines,
+						  int[:,:,::1] workspace, int valid_heads):
+	"""Update the heads matrix in the workspace and return the makespan.
+
+	Arguments:
+		sequence: Numpy array with current solution (job sequence).
+		processing_times: Numpy 2d array with processing times.
+		num_machines: Number of machines in this problem (int).
+		workspace: Numpy 3d array used by taillard_acceleration.
+		valid_heads: Number of leading rows of e that are valid for sequence (int).
+
+	Returns:
+		makespan: Completion time of the last job in the last machine.
+	"""
+	cdef int sequence_length = len(sequence)
+	if workspace.shape[1] < sequence_length + 2 or workspace.shape[2] < num_machines + 2:
+		raise ValueError("workspace is too small for this sequence")
+
+	cdef int[:,::1] e = workspace[0]
+	with nogil:
+		_update_heads(sequence, processing_times, num_machines, e, valid_heads)
+	return e[sequence_length, num_machines]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _update_heads(int[:] sequence, const int[:,:] processing_times, int num_machines,
+						int[:,::1] e, int valid_heads) noexcept nogil:
+	"""Compute the rows of the heads matrix after the first valid_heads rows.
+
+	Row 0 holds the time each machine becomes available; it is zero unless
+	the caller sets it (see Solution.release_times) and is not changed here.
+	"""
+	cdef int sequence_length, i, j
+	sequence_length = sequence.shape[0]
+
+	for i in range(valid_heads + 1, sequence_length + 1):
+		e[i, 0] = 0
+		for j in range(1, num_machines + 1):
+			if e[i, j - 1] > e[i - 1, j]:
+				e[i, j] = e[i, j - 1] + processing_times[sequence[i - 1]-1, j-1]
+			else:
+				e[i, j] = e[i - 1, j] + processing_times[sequence[i - 1]-1, j-1]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _update_tails(int[:] sequence, const int[:,:] processing_times, int num_machines,
+						int[:,::1] q, int valid_tails) noexcept nogil:
+	"""Compute the rows of the (reversed) tails matrix after the first valid_tails rows."""
+	cdef int sequence_length, k, j, job
+	sequence_length = sequence.shape[0]
+
+	for j in range(0, num_machines + 2):
+		q[0, j] = 0
+
+	for k in range(valid_tails + 1, sequence_length + 1):
+		job = sequence[sequence_length - k] - 1
+		q[k, num_machines + 1] = 0
+		for j in range(num_machines, 0, -1):
+			if q[k, j + 1] > q[k - 1, j]:
+				q[k, j] = q[k, j + 1] + processing_times[job, j-1]
+			else:
+				q[k, j] = q[k - 1, j] + processing_times[job, j-1]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int tie_breaking(int[:] sequence, const int[:,:] processing_times, int[:,::1] e, int[:,::1] f, int[:,::1] fl, int[::1] ms,
+					  int inserting_job, int best_position, int sequence_length, int num_machines) noexcept nogil:
 	"""Tie breaking when there are many insertion positions with the same makespan.
 
 	Find the best position between n positions with the same makespan based
@@ -110,9 +281,11 @@ cdef tie_breaking(int[:,:] processing_times, int[:,:] e, int[:,:] f, int[:] ms,
 	flowshop scheduling problem", Computers & Operations Research 45 (2014), p60–67.
 
 	Arguments:
+		sequence: Numpy array with the sequence without the inserting job.
 		processing_times: Numpy 2d array with processing times.
 		e: Completion times
 		f: See reference for details
+		fl: Workspace for the idle time approximation.
 		ms: Makespan for each possible insertion position.
 		inserting_job: Job to insert.
 		best_position: Best insertion position based on makespan.
@@ -123,8 +296,7 @@ cdef tie_breaking(int[:,:] processing_times, int[:,:] e, int[:,:] f, int[:] ms,
 		best_position: Index for best insertion position.
 	"""
 	cdef int best_makespan, num_ties, itbp
-	cdef int it, tie, i, j
-	cdef int fl[801][61]
+	cdef int it, tie, i, j, next_job
 
 	# Save best makespan and start idle time of best position with a high value
 	best_makespan = ms[best_position]
@@ -138,22 +310,24 @@ cdef tie_breaking(int[:,:] processing_times, int[:,:] e, int[:,:] f, int[:] ms,
 			num_ties += 1
 
 			# If last position in sequence
-			if i == sequence_length:
+			if i == sequence_length + 1:
 				for j in range(1, num_machines + 1):
-					it += f[sequence_length][j] - e[sequence_length - 1][j] - processing_times[inserting_job - 1,j - 1]
+					it += f[i, j] - e[i - 1, j] - processing_times[inserting_job - 1,j - 1]
 
-			# If not last position
+			# If not last position: fl holds the new completion times of the
+			# job that follows the inserted one
 			else:
-				fl[i][1] = f[i][1] + processing_times[i - 1][0]
+				next_job = sequence[i - 1] - 1
+				fl[i, 1] = f[i, 1] + processing_times[next_job, 0]
 				for j in range(2, num_machines + 1):
-					it += f[i][j] - e[i][j] + processing_times[i - 1,j - 1] - processing_times[inserting_job - 1,j - 1]
-					if fl[i][j - 1] - f[i][j] > 0:
-						it += fl[i][j - 1] - f[i][j]
+					it += f[i, j] - e[i, j] + processing_times[next_job,j - 1] - processing_times[inserting_job - 1,j - 1]
+					if fl[i, j - 1] - f[i, j] > 0:
+						it += fl[i, j - 1] - f[i, j]
 
-					if fl[i][j - 1] > f[i][j]:
-						fl[i][j] = fl[i][j - 1] + processing_times[i - 1,j - 1]
+					if fl[i, j - 1] > f[i, j]:
+						fl[i, j] = fl[i, j - 1] + processing_times[next_job,j - 1]
 					else:
-						fl[i][j] = fl[i][j] + processing_times[i - 1,j - 1]
+						fl[i, j] = f[i, j] + processing_times[next_job,j - 1]
 
 			if it < itbp:
 				best_position = i
@@ -164,7 +338,8 @@ cdef tie_breaking(int[:,:] processing_times, int[:,:] e, int[:,:] f, int[:] ms,
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-cpdef calculate_completion_times(int[:] sequence, int[:,:] processing_times, int num_machines, int return_array):
+cpdef calculate_completion_times(int[:] sequence, const int[:,:] processing_times, int num_machines, int return_array,
+								 const int[:] release_times):
 	"""Calculate completion times for each job in each machine.
 
 	Arguments:
@@ -174,6 +349,8 @@ cpdef calculate_completion_times(int[:] sequence, int[:,:] processing_times, int
 		return_array: If 1 return array with each completition time,
 		if 0 return just an integer with the completion time of the
 		last job in the last machine.
+		release_times: Numpy array with the time each machine becomes
+		available (see Solution.release_times).
 
 	Returns:
 		e: 2d array with the completion time of each job in each machine or
@@ -186,17 +363,10 @@ cpdef calculate_completion_times(int[:] sequence, int[:,:] processing_times, int
 	# Memory view on numpy array
 	cdef int[:,::1] e = zeros((sequence_length+1,num_machines+1), dtype='int32')
 
-	for i in range(1, sequence_length + 1):
-		e[i,0] = 0
+	with nogil:
 		for j in range(1, num_machines + 1):
-			if i == 1:
-				e[0,j] = 0
-
-			if e[i - 1, j] > e[i, j - 1]:
-				e[i, j] = e[i - 1, j] + processing_times[sequence[i - 1]-1, j-1]
-			else:
-				e[i, j] = e[i, j - 1] + processing_times[sequence[i - 1]-1, j-1]
-
+			e[0, j] = release_times[j - 1]
+		_update_heads(sequence, processing_times, num_machines, e, 0)
 
 	# Return completion times array or just makespan (integer)
 	if return_array > 0:
@@ -207,13 +377,99 @@ cpdef calculate_completion_times(int[:] sequence, int[:,:] processing_times, int
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-cpdef calculate_idle_times(int[:] sequence, int[:,:] processing_times, int num_machines):
+cpdef batch_completion_times(const int[:,::1] sequences, const int[:,:] processing_times, int num_machines,
+							 int return_array, int num_threads=1):
+	"""Calculate the makespan (or completion times) of many sequences in one call.
+
+	The sequences are evaluated without the GIL and, with num_threads > 1,
+	in parallel (OpenMP). Each makespan only keeps one row of completion times.
+
+	Arguments:
+		sequences: Numpy 2d int32 array with one sequence in each row.
+		processing_times: Numpy 2d array with processing times.
+		num_machines: Number of machines in this problem (int).
+		return_array: If 1 return the completion times of each sequence,
+		if 0 return just the makespans.
+		num_threads: Threads for evaluating the sequences (int, default: 1).
+
+	Returns:
+		completion_times: 3d array (sequences x positions x machines) with the
+		completion time of the job at each position on each machine, or 1d
+		array with the makespan of each sequence.
+	"""
+	cdef int num_sequences, sequence_length, k
+	num_sequences = sequences.shape[0]
+	sequence_length = sequences.shape[1]
+
+	cdef int[::1] makespans = zeros(num_sequences, dtype='int32')
+	cdef int[:,::1] rows
+	cdef int[:,:,::1] completion_times
+	if return_array > 0:
+		completion_times = zeros((num_sequences, sequence_length, num_machines), dtype='int32')
+		with nogil:
+			if num_threads > 1:
+				for k in prange(num_sequences, num_threads=num_threads, schedule='static'):
+					_sequence_completion_times(sequences[k], processing_times, num_machines, completion_times[k])
+			else:
+				for k in range(num_sequences):
+					_sequence_completion_times(sequences[k], processing_times, num_machines, completion_times[k])
+		return completion_times.base
+
+	rows = zeros((num_sequences, num_machines + 1), dtype='int32')
+	with nogil:
+		if num_threads > 1:
+			for k in prange(num_sequences, num_threads=num_threads, schedule='static'):
+				makespans[k] = _sequence_makespan(sequences[k], processing_times, num_machines, rows[k])
+		else:
+			for k in range(num_sequences):
+				makespans[k] = _sequence_makespan(sequences[k], processing_times, num_machines, rows[k])
+	return makespans.base
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _sequence_makespan(const int[::1] sequence, const int[:,:] processing_times, int num_machines,
+							int[::1] row) noexcept nogil:
+	"""Return the makespan of a sequence, keeping the last completion times in row (zeros)."""
+	cdef int i, j, job
+	for i in range(sequence.shape[0]):
+		job = sequence[i] - 1
+		for j in range(1, num_machines + 1):
+			if row[j - 1] > row[j]:
+				row[j] = row[j - 1]
+			row[j] += processing_times[job, j - 1]
+	return row[num_machines]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _sequence_completion_times(const int[::1] sequence, const int[:,:] processing_times, int num_machines,
+									 int[:,::1] completion_times) noexcept nogil:
+	"""Fill the completion times (positions x machines) of a sequence."""
+	cdef int i, j, job, start
+	for i in range(sequence.shape[0]):
+		job = sequence[i] - 1
+		for j in range(num_machines):
+			start = 0
+			if i > 0:
+				start = completion_times[i - 1, j]
+			if j > 0 and completion_times[i, j - 1] > start:
+				start = completion_times[i, j - 1]
+			completion_times[i, j] = start + processing_times[job, j]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef calculate_idle_times(int[:] sequence, const int[:,:] processing_times, int num_machines,
+						   const int[:] release_times):
 	"""Calculate idle times for each job in each machine.
 
 	Arguments:
 		sequence: Numpy array with Current sequence
 		processing_times: Numpy 2d array with processing times.
 		num_machines: Number of machines in this problem.
+		release_times: Numpy array with the time each machine becomes
+		available; the idle time of the first job is counted from it.
 
 	Returns:
 		idle_times: Assigned idle time for each job
@@ -227,10 +483,920 @@ cpdef calculate_idle_times(int[:] sequence, int[:,:] processing_times, int num_m
 	cdef int[:] idle_time = zeros((sequence_length), dtype='int32')
 	cdef int[:,::1] e
 
-	e = calculate_completion_times(sequence, processing_times, num_machines, 1)
+	e = calculate_completion_times(sequence, processing_times, num_machines, 1, release_times)
+
+	with nogil:
+		for i in range(0, sequence_length):
+			idle_time[sequence[i] - 1] = 0
+			for j in range(1, num_machines + 1):
+				idle_time[sequence[i] - 1] += e[i + 1, j] - processing_times[sequence[i]-1, j-1] - e[i, j]
+	return idle_time
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef calculate_objective(int[:] sequence, const int[:,:] processing_times, int num_machines, int objective,
+						  const int[::1] due_dates, const int[::1] weights, int[:,:,::1] workspace,
+						  int valid_heads):
+	"""Update the heads matrix in the workspace and return the objective value.
+
+	Arguments:
+		sequence: Numpy array with current solution (job sequence).
+		processing_times: Numpy 2d array with processing times.
+		num_machines: Number of machines in this problem (int).
+		objective: 1 for total flowtime and 2 for total weighted tardiness (int).
+		due_dates: Numpy array with the due date of each job (tardiness only).
+		weights: Numpy array with the weight of each job (tardiness only).
+		workspace: Numpy 3d array used by taillard_acceleration.
+		valid_heads: Number of leading rows of e that are valid for sequence (int).
+
+	Returns:
+		value: Objective value of the sequence.
+		makespan: Completion time of the last job in the last machine.
+	"""
+	cdef int sequence_length = len(sequence)
+	cdef int i
+	cdef long long value = 0
+	if workspace.shape[1] < sequence_length + 2 or workspace.shape[2] < num_machines + 2:
+		raise ValueError("workspace is too small for this sequence")
+
+	cdef int[:,::1] e = workspace[0]
+	with nogil:
+		_update_heads(sequence, processing_times, num_machines, e, valid_heads)
+		for i in range(1, sequence_length + 1):
+			value += _job_cost(objective, sequence[i - 1], e[i, num_machines], due_dates, weights)
+	return value, e[sequence_length, num_machines]
+
 
-	for i in range(0, sequence_length):
-		idle_time[sequence[i] - 1] = 0
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef objective_insertion(int[:] sequence, const int[:,:] processing_times, int inserting_job, int num_machines,
+						  int objective, const int[::1] due_dates, const int[::1] weights,
+						  int[:,:,::1] workspace, long long[::1] costs, int valid_heads):
+	"""Find the best position to insert a job for the flowtime or tardiness objective.
+
+	The heads of the jobs before each position are taken from the workspace
+	and the cost of these jobs from their prefix sums, so only the inserted
+	job and the jobs after it are computed. Both objectives only grow as the
+	remaining jobs are added, so a position is abandoned as soon as its
+	partial value reaches the best value found; the result is the same.
+
+	Arguments:
+		sequence: Numpy array with current solution (job sequence).
+		processing_times: Numpy 2d array with processing times.
+		inserting_job: Job to insert (int)
+		num_machines: Number of machines in this problem (int).
+		objective: 1 for total flowtime and 2 for total weighted tardiness (int).
+		due_dates: Numpy array with the due date of each job (tardiness only).
+		weights: Numpy array with the weight of each job (tardiness only).
+		workspace: Numpy 3d array used by taillard_acceleration.
+		costs: Numpy int64 array with at least num_jobs + 2 elements (scratch).
+		valid_heads: Number of leading rows of e that are valid for sequence (int).
+
+	Returns:
+		best_position: Index for position with min objective (starting at 1).
+		best_value: Objective value after inserting the job.
+		makespan: Makespan after inserting the job.
+	"""
+	cdef int sequence_length, best_position, makespan
+	cdef long long best_value
+	sequence_length = len(sequence)
+	if (workspace.shape[0] < 4 or workspace.shape[1] < sequence_length + 2
+			or workspace.shape[2] < num_machines + 2 or costs.shape[0] < sequence_length + 2):
+		raise ValueError("workspace is too small for this sequence")
+
+	cdef int[:,::1] e = workspace[0]
+	cdef int[:,::1] f = workspace[2]
+	with nogil:
+		best_position = _objective_insertion(sequence, processing_times, inserting_job, num_machines,
+											 objective, due_dates, weights, e, f, costs, valid_heads,
+											 &best_value, &makespan)
+	return best_position, best_value, makespan
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _objective_insertion(int[:] sequence, const int[:,:] processing_times, int inserting_job,
+							  int num_machines, int objective, const int[::1] due_dates,
+							  const int[::1] weights, int[:,::1] e, int[:,::1] f, long long[::1] costs,
+							  int valid_heads, long long* best_value, int* best_makespan) noexcept nogil:
+	"""Return the best position to insert the job (see objective_insertion).
+
+	Row i of f is used as the completion times of the last scheduled job
+	when the job is inserted in position i.
+	"""
+	cdef int sequence_length, best_position, i, j, k, job
+	cdef long long value
+	sequence_length = sequence.shape[0]
+
+	_update_heads(sequence, processing_times, num_machines, e, valid_heads)
+	# Cost of the first i jobs of the sequence
+	costs[0] = 0
+	for i in range(1, sequence_length + 1):
+		costs[i] = costs[i - 1] + _job_cost(objective, sequence[i - 1], e[i, num_machines], due_dates, weights)
+
+	best_position = 0
+	best_value[0] = 0
+	for i in range(1, sequence_length + 2):
+		value = costs[i - 1]
+		# Inserted job, then the jobs after it (rows are overwritten in place)
 		for j in range(1, num_machines + 1):
-			idle_time[sequence[i] - 1] += e[i + 1, j] - processing_times[sequence[i]-1, j-1] - e[i, j]
-	return idle_time
\ No newline at end of file
+			f[i, j] = e[i - 1, j]
+		f[i, 0] = 0
+		for k in range(i - 1, sequence_length + 1):
+			if k == i - 1:
+				job = inserting_job
+			else:
+				job = sequence[k - 1]
+			for j in range(1, num_machines + 1):
+				if f[i, j - 1] > f[i, j]:
+					f[i, j] = f[i, j - 1] + processing_times[job - 1, j - 1]
+				else:
+					f[i, j] = f[i, j] + processing_times[job - 1, j - 1]
+			value += _job_cost(objective, job, f[i, num_machines], due_dates, weights)
+			if best_position > 0 and value >= best_value[0]:
+				break
+
+		if best_position == 0 or value < best_value[0]:
+			best_position = i
+			best_value[0] = value
+			best_makespan[0] = f[i, num_machines]
+	return best_position
+
+
+cdef inline long long _job_cost(int objective, int job, int completion_time, const int[::1] due_dates,
+								const int[::1] weights) noexcept nogil:
+	"""Contribution of a job to the objective (1 flowtime, 2 weighted tardiness)."""
+	cdef long long tardiness
+	if objective == 1:
+		return completion_time
+	tardiness = completion_time - due_dates[job - 1]
+	if tardiness > 0:
+		return tardiness * weights[job - 1]
+	return 0
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef objective_local_search(int[::1] sequence, int sequence_length, const int[:,:] processing_times,
+							 int num_machines, int objective, const int[::1] due_dates, const int[::1] weights,
+							 int local_optimum, int[:,:,::1] workspace, long long[::1] costs, int[::1] order,
+							 unsigned long long seed, int valid_heads):
+	"""Insertion neighborhood local search for the flowtime or tardiness objective.
+
+	Same search as insertion_local_search (random order, first improvement),
+	with the insertion positions evaluated by objective_insertion.
+
+	Arguments:
+		sequence: Numpy array with the sequence in the first sequence_length elements.
+		sequence_length: Number of jobs in the sequence (int).
+		processing_times: Numpy 2d array with processing times.
+		num_machines: Number of machines in this problem (int).
+		objective: 1 for total flowtime and 2 for total weighted tardiness (int).
+		due_dates: Numpy array with the due date of each job (tardiness only).
+		weights: Numpy array with the weight of each job (tardiness only).
+		local_optimum: Repeat search until local optimum (int, 1 or 0).
+		workspace: Numpy 3d array used by taillard_acceleration.
+		costs: Numpy int64 array with at least num_jobs + 2 elements (scratch).
+		order: Numpy array with at least sequence_length elements (scratch).
+		seed: Seed for shuffling the jobs (int).
+		valid_heads: Number of leading rows of e that are valid for sequence (int).
+
+	Returns:
+		value: Objective value of the final sequence.
+		makespan: Makespan of the final sequence.
+		evaluations: Number of objective values evaluated (including partial ones).
+		valid_heads: Valid rows of e for the final sequence.
+		valid_tails: Valid rows of q for the final sequence.
+	"""
+	cdef int improve, evaluations, job, position, makespan, i
+	cdef long long current_value, value
+	cdef int valid_tails = 0
+	cdef unsigned long long state = seed
+	if (workspace.shape[0] < 4 or workspace.shape[1] < sequence_length + 2
+			or workspace.shape[2] < num_machines + 2 or costs.shape[0] < sequence_length + 2
+			or order.shape[0] < sequence_length or sequence.shape[0] < sequence_length):
+		raise ValueError("workspace is too small for this sequence")
+
+	cdef int[:,::1] e = workspace[0]
+	cdef int[:,::1] f = workspace[2]
+
+	with nogil:
+		# Objective of the initial sequence
+		_update_heads(sequence[:sequence_length], processing_times, num_machines, e, valid_heads)
+		valid_heads = sequence_length
+		current_value = 0
+		for i in range(1, sequence_length + 1):
+			current_value += _job_cost(objective, sequence[i - 1], e[i, num_machines], due_dates, weights)
+		makespan = e[sequence_length, num_machines]
+		evaluations = 1
+
+		improve = sequence_length > 1 and current_value > 0
+		while improve:
+			improve = 0
+			for i in range(sequence_length):
+				order[i] = sequence[i]
+			_shuffle(order, sequence_length, &state)
+
+			for i in range(sequence_length):
+				job = order[i]
+				position = _remove(sequence, sequence_length, job)
+				sequence_length -= 1
+				if valid_heads > position:
+					valid_heads = position
+
+				position = _objective_insertion(sequence[:sequence_length], processing_times, job,
+												num_machines, objective, due_dates, weights, e, f, costs,
+												valid_heads, &value, &makespan)
+				evaluations += sequence_length + 1
+				valid_heads = position - 1
+				sequence_length = _insert(sequence, sequence_length, position - 1, job)
+
+				if value < current_value:
+					improve = 1
+					current_value = value
+					# Optimal - no tardy jobs
+					if current_value == 0:
+						improve = 0
+						break
+			if local_optimum == 0:
+				break
+	# Tails are not used by this search and are no longer valid
+	return current_value, makespan, evaluations, valid_heads, valid_tails
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef insertion_local_search(int[::1] sequence, int sequence_length, const int[:,:] processing_times,
+							 int num_machines, int use_tie_breaking, int local_optimum,
+							 int[:,:,::1] workspace, int[::1] ms, int[::1] order, unsigned long long seed,
+							 int valid_heads, int valid_tails, int num_threads=1, int prune=0,
+							 int lower_bound=0):
+	"""Insertion neighborhood local search (first improvement) on a sequence buffer.
+
+	Each job, in random order, is removed and inserted in its best position.
+	The pass is repeated while the makespan improves (if local_optimum > 0).
+	The whole search runs without the GIL and changes the buffer in place.
+	It stops early if the makespan reaches lower_bound (when it is > 0).
+
+	Arguments:
+		sequence: Numpy array with the sequence in the first sequence_length elements.
+		sequence_length: Number of jobs in the sequence (int).
+		processing_times: Numpy 2d array with processing times.
+		num_machines: Number of machines in this problem (int).
+		use_tie_breaking: Use tie breaking mechanism (int, 1 or 0).
+		local_optimum: Repeat search until local optimum (int, 1 or 0).
+		workspace: Numpy 3d array used by taillard_acceleration.
+		ms: Numpy array with at least num_jobs + 2 elements.
+		order: Numpy array with at least sequence_length elements (scratch).
+		seed: Seed for shuffling the jobs (int).
+		valid_heads: Number of leading rows of e that are valid for sequence (int).
+		valid_tails: Number of trailing jobs whose rows of q are valid (int).
+		num_threads: Threads for evaluating the positions (int, default: 1).
+		prune: Abandon dominated insertion positions early (int, 1 or 0, default: 0).
+		lower_bound: Lower bound for the makespan of this sequence (int, default: 0).
+
+	Returns:
+		makespan: Makespan of the final sequence.
+		evaluations: Number of makespans evaluated.
+		valid_heads: Valid rows of e for the final sequence.
+		valid_tails: Valid rows of q for the final sequence.
+	"""
+	cdef int current_makespan, improve, evaluations, job, position, i
+	cdef unsigned long long state = seed
+	if (workspace.shape[0] < 4 or workspace.shape[1] < sequence_length + 2
+			or workspace.shape[2] < num_machines + 2 or ms.shape[0] < sequence_length + 2
+			or order.shape[0] < sequence_length or sequence.shape[0] < sequence_length):
+		raise ValueError("workspace is too small for this sequence")
+
+	cdef int[:,::1] e = workspace[0]
+	cdef int[:,::1] q = workspace[1]
+	cdef int[:,::1] f = workspace[2]
+	cdef int[:,::1] fl = workspace[3]
+
+	with nogil:
+		# Makespan of the initial sequence
+		_update_heads(sequence[:sequence_length], processing_times, num_machines, e, valid_heads)
+		valid_heads = sequence_length
+		current_makespan = e[sequence_length, num_machines]
+		evaluations = 1
+
+		# If parameter local_optimum is true: repeat while solution is improved
+		improve = sequence_length > 1 and current_makespan > lower_bound
+		while improve:
+			improve = 0
+			# Select random elements without repetition
+			for i in range(sequence_length):
+				order[i] = sequence[i]
+			_shuffle(order, sequence_length, &state)
+
+			for i in range(sequence_length):
+				# Reinsert job in best position and check improvement
+				position = _reinsert(sequence, sequence_length, processing_times, order[i], num_machines,
+									 use_tie_breaking, e, q, f, fl, ms, &valid_heads, &valid_tails,
+									 num_threads, prune)
+				evaluations += sequence_length
+
+				if ms[position] < current_makespan:
+					improve = 1
+					current_makespan = ms[position]
+					# Optimal - no improvement is possible
+					if current_makespan <= lower_bound:
+						improve = 0
+						break
+			if local_optimum == 0:
+				break
+	return current_makespan, evaluations, valid_heads, valid_tails
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _reinsert(int[::1] sequence, int sequence_length, const int[:,:] processing_times, int job,
+				   int num_machines, int use_tie_breaking, int[:,::1] e, int[:,::1] q, int[:,::1] f,
+				   int[:,::1] fl, int[::1] ms, int* valid_heads, int* valid_tails, int num_threads,
+				   int prune) noexcept nogil:
+	"""Remove the job and insert it in its best position (see taillard_acceleration).
+
+	Updates the number of valid heads and tails rows and returns the new
+	position (starting at 1; the makespan is in ms), or -1 if the job is not
+	in the sequence.
+	"""
+	cdef int position = _remove(sequence, sequence_length, job)
+	if position < 0:
+		return -1
+	sequence_length -= 1
+	if valid_heads[0] > position:
+		valid_heads[0] = position
+	if valid_tails[0] > sequence_length - position:
+		valid_tails[0] = sequence_length - position
+
+	position = _best_insertion(sequence[:sequence_length], processing_times, job, num_machines,
+							   use_tie_breaking, e, q, f, fl, ms, valid_heads[0], valid_tails[0],
+							   num_threads, prune)
+	valid_heads[0] = position - 1
+	valid_tails[0] = sequence_length + 1 - position
+	_insert(sequence, sequence_length, position - 1, job)
+	return position
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef reference_local_search(int[::1] sequence, int sequence_length, const int[:,:] processing_times,
+							 int num_machines, int use_tie_breaking, const int[::1] reference,
+							 int[:,:,::1] workspace, int[::1] ms, int valid_heads, int valid_tails,
+							 int num_threads=1, int prune=0, int lower_bound=0):
+	"""Reference (RZ) local search on a sequence buffer.
+
+	Jobs are taken cyclically in the order of the reference sequence (usually
+	the best solution found), removed and inserted in their best position.
+	The search stops after sequence_length consecutive jobs without
+	improvement, or when the makespan reaches lower_bound (when it is > 0).
+
+	Reference:
+	"Ant-colony algorithms for permutation flowshop scheduling to minimize
+	makespan/total flowtime of jobs", Rajendran, C. and Ziegler, H.,
+	EJOR 155 (2004), p426-438.
+
+	Arguments:
+		sequence: Numpy array with the sequence in the first sequence_length elements.
+		sequence_length: Number of jobs in the sequence (int).
+		processing_times: Numpy 2d array with processing times.
+		num_machines: Number of machines in this problem (int).
+		use_tie_breaking: Use tie breaking mechanism (int, 1 or 0).
+		reference: Numpy array with the same jobs as the sequence (not the same buffer).
+		workspace: Numpy 3d array used by taillard_acceleration.
+		ms: Numpy array with at least num_jobs + 2 elements.
+		valid_heads: Number of leading rows of e that are valid for sequence (int).
+		valid_tails: Number of trailing jobs whose rows of q are valid (int).
+		num_threads: Threads for evaluating the positions (int, default: 1).
+		prune: Abandon dominated insertion positions early (int, 1 or 0, default: 0).
+		lower_bound: Lower bound for the makespan of this sequence (int, default: 0).
+
+	Returns:
+		makespan: Makespan of the final sequence.
+		evaluations: Number of makespans evaluated.
+		valid_heads: Valid rows of e for the final sequence.
+		valid_tails: Valid rows of q for the final sequence.
+	"""
+	cdef int current_makespan, evaluations, position, counter, i
+	if (workspace.shape[0] < 4 or workspace.shape[1] < sequence_length + 2
+			or workspace.shape[2] < num_machines + 2 or ms.shape[0] < sequence_length + 2
+			or sequence.shape[0] < sequence_length):
+		raise ValueError("workspace is too small for this sequence")
+	if reference.shape[0] != sequence_length:
+		raise ValueError("reference and sequence must have the same jobs")
+
+	cdef int[:,::1] e = workspace[0]
+	cdef int[:,::1] q = workspace[1]
+	cdef int[:,::1] f = workspace[2]
+	cdef int[:,::1] fl = workspace[3]
+
+	with nogil:
+		_update_heads(sequence[:sequence_length], processing_times, num_machines, e, valid_heads)
+		valid_heads = sequence_length
+		current_makespan = e[sequence_length, num_machines]
+		evaluations = 1
+
+		counter = 0
+		i = 0
+		position = 0
+		while sequence_length > 1 and counter < sequence_length and current_makespan > lower_bound:
+			position = _reinsert(sequence, sequence_length, processing_times, reference[i], num_machines,
+								 use_tie_breaking, e, q, f, fl, ms, &valid_heads, &valid_tails,
+								 num_threads, prune)
+			if position < 0:
+				break
+			evaluations += sequence_length
+
+			if ms[position] < current_makespan:
+				current_makespan = ms[position]
+				counter = 0
+			else:
+				counter += 1
+			i = (i + 1) % sequence_length
+
+	if position < 0:
+		raise ValueError("job {} of the reference is not in the sequence".format(reference[i]))
+	return current_makespan, evaluations, valid_heads, valid_tails
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef swap_local_search(int[::1] sequence, int sequence_length, const int[:,:] processing_times,
+						int num_machines, int local_optimum, int[:,:,::1] workspace,
+						int valid_heads, int valid_tails, int lower_bound=0):
+	"""Swap (interchange) neighborhood local search (first improvement) on a sequence buffer.
+
+	Every pair of positions (a, b) is evaluated in order and the first swap
+	that improves the makespan is applied. The heads before a and the tails
+	after b are taken from the workspace, so only the rows between a and b
+	are computed for each pair (O(m) for adjacent jobs). The pass is repeated
+	while the makespan improves (if local_optimum > 0).
+
+	Arguments:
+		sequence: Numpy array with the sequence in the first sequence_length elements.
+		sequence_length: Number of jobs in the sequence (int).
+		processing_times: Numpy 2d array with processing times.
+		num_machines: Number of machines in this problem (int).
+		local_optimum: Repeat search until local optimum (int, 1 or 0).
+		workspace: Numpy 3d array used by taillard_acceleration.
+		valid_heads: Number of leading rows of e that are valid for sequence (int).
+		valid_tails: Number of trailing jobs whose rows of q are valid (int).
+		lower_bound: Lower bound for the makespan of this sequence (int, default: 0).
+
+	Returns:
+		makespan: Makespan of the final sequence.
+		evaluations: Number of makespans evaluated.
+		valid_heads: Valid rows of e for the final sequence.
+		valid_tails: Valid rows of q for the final sequence.
+	"""
+	cdef int current_makespan, improve, evaluations, makespan, a, b, tmp
+	if (workspace.shape[0] < 4 or workspace.shape[1] < sequence_length + 2
+			or workspace.shape[2] < num_machines + 2 or sequence.shape[0] < sequence_length):
+		raise ValueError("workspace is too small for this sequence")
+
+	cdef int[:,::1] e = workspace[0]
+	cdef int[:,::1] q = workspace[1]
+	cdef int[:,::1] f = workspace[2]
+
+	with nogil:
+		_update_heads(sequence[:sequence_length], processing_times, num_machines, e, valid_heads)
+		_update_tails(sequence[:sequence_length], processing_times, num_machines, q, valid_tails)
+		current_makespan = e[sequence_length, num_machines]
+		evaluations = 1
+
+		improve = sequence_length > 1 and current_makespan > lower_bound
+		while improve:
+			improve = 0
+			for a in range(sequence_length - 1):
+				for b in range(a + 1, sequence_length):
+					makespan = _swap_makespan(sequence, processing_times, num_machines, e, q, f,
+											  a, b, sequence_length)
+					evaluations += 1
+					if makespan < current_makespan:
+						improve = 1
+						current_makespan = makespan
+						tmp = sequence[a]
+						sequence[a] = sequence[b]
+						sequence[b] = tmp
+						# Heads before a and tails after b are still valid
+						_update_heads(sequence[:sequence_length], processing_times, num_machines, e, a)
+						_update_tails(sequence[:sequence_length], processing_times, num_machines, q,
+									  sequence_length - b - 1)
+						if current_makespan <= lower_bound:
+							break
+				if current_makespan <= lower_bound:
+					improve = 0
+					break
+			if local_optimum == 0:
+				break
+	return current_makespan, evaluations, sequence_length, sequence_length
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _swap_makespan(int[::1] sequence, const int[:,:] processing_times, int num_machines,
+						int[:,::1] e, int[:,::1] q, int[:,::1] f, int a, int b,
+						int sequence_length) noexcept nogil:
+	"""Makespan of the sequence with the jobs at indexes a < b swapped.
+
+	Rows a + 1 to b + 1 of f hold the heads of the swapped sequence.
+	"""
+	cdef int i, j, job, makespan, tmp
+	for i in range(a + 1, b + 2):
+		if i == a + 1:
+			job = sequence[b] - 1
+		elif i == b + 1:
+			job = sequence[a] - 1
+		else:
+			job = sequence[i - 1] - 1
+
+		f[i, 0] = 0
+		for j in range(1, num_machines + 1):
+			if i == a + 1:
+				tmp = e[a, j]
+			else:
+				tmp = f[i - 1, j]
+			if f[i, j - 1] > tmp:
+				f[i, j] = f[i, j - 1] + processing_times[job, j - 1]
+			else:
+				f[i, j] = tmp + processing_times[job, j - 1]
+
+	# Join with the tails of the jobs after b
+	makespan = 0
+	for j in range(1, num_machines + 1):
+		tmp = f[b + 1, j] + q[sequence_length - b - 1, j]
+		if tmp > makespan:
+			makespan = tmp
+	return makespan
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef block_local_search(int[::1] sequence, int sequence_length, const int[:,:] processing_times,
+						 int num_machines, int block_size, int local_optimum, int[:,:,::1] workspace,
+						 int[::1] ms, int[::1] block, int valid_heads, int valid_tails, int lower_bound=0):
+	"""Block insertion neighborhood local search on a sequence buffer.
+
+	Each run of block_size consecutive jobs, from the first to the last
+	position, is removed and inserted (in the same order) in the position
+	with minimum makespan. The block is evaluated like a single job in the
+	Taillard acceleration, so each position costs O(block_size * m). The
+	pass is repeated while the makespan improves (if local_optimum > 0).
+
+	Arguments:
+		sequence: Numpy array with the sequence in the first sequence_length elements.
+		sequence_length: Number of jobs in the sequence (int).
+		processing_times: Numpy 2d array with processing times.
+		num_machines: Number of machines in this problem (int).
+		block_size: Number of consecutive jobs moved together; the sequence is not
+		changed if it is not smaller than sequence_length (int).
+		local_optimum: Repeat search until local optimum (int, 1 or 0).
+		workspace: Numpy 3d array used by taillard_acceleration.
+		ms: Numpy array with at least num_jobs + 2 elements.
+		block: Numpy array with at least block_size elements (scratch).
+		valid_heads: Number of leading rows of e that are valid for sequence (int).
+		valid_tails: Number of trailing jobs whose rows of q are valid (int).
+		lower_bound: Lower bound for the makespan of this sequence (int, default: 0).
+
+	Returns:
+		makespan: Makespan of the final sequence.
+		evaluations: Number of makespans evaluated.
+		valid_heads: Valid rows of e for the final sequence.
+		valid_tails: Valid rows of q for the final sequence.
+	"""
+	cdef int current_makespan, improve, evaluations, length, best_position, start, i
+	if block_size < 1:
+		raise ValueError("block_size must be positive")
+	if (workspace.shape[0] < 4 or workspace.shape[1] < sequence_length + 2
+			or workspace.shape[2] < num_machines + 2 or ms.shape[0] < sequence_length + 2
+			or sequence.shape[0] < sequence_length):
+		raise ValueError("workspace is too small for this sequence")
+	# A block with all jobs (or more) has no other position: the sequence is unchanged
+	if block_size < sequence_length and block.shape[0] < block_size:
+		raise ValueError("block must have at least block_size elements")
+
+	cdef int[:,::1] e = workspace[0]
+	cdef int[:,::1] q = workspace[1]
+	cdef int[:,::1] f = workspace[2]
+
+	with nogil:
+		_update_heads(sequence[:sequence_length], processing_times, num_machines, e, valid_heads)
+		valid_heads = sequence_length
+		current_makespan = e[sequence_length, num_machines]
+		evaluations = 1
+		length = sequence_length - block_size
+
+		improve = length > 0 and current_makespan > lower_bound
+		while improve:
+			improve = 0
+			for start in range(length + 1):
+				# Remove the block
+				for i in range(block_size):
+					block[i] = sequence[start + i]
+				for i in range(start, length):
+					sequence[i] = sequence[i + block_size]
+				if valid_heads > start:
+					valid_heads = start
+				if valid_tails > length - start:
+					valid_tails = length - start
+				_update_heads(sequence[:length], processing_times, num_machines, e, valid_heads)
+				_update_tails(sequence[:length], processing_times, num_machines, q, valid_tails)
+
+				# Makespan of the block in each position (first position with the minimum)
+				best_position = 1
+				for i in range(1, length + 2):
+					_block_makespan(processing_times, e, q, f, ms, block, block_size, i, length,
+									num_machines, ms[best_position] if i > 1 else 0)
+					if ms[i] < ms[best_position]:
+						best_position = i
+				evaluations += length + 1
+
+				# Insert the block in the best position
+				for i in range(length - 1, best_position - 2, -1):
+					sequence[i + block_size] = sequence[i]
+				for i in range(block_size):
+					sequence[best_position - 1 + i] = block[i]
+				valid_heads = best_position - 1
+				valid_tails = length + 1 - best_position
+
+				if ms[best_position] < current_makespan:
+					improve = 1
+					current_makespan = ms[best_position]
+					if current_makespan <= lower_bound:
+						improve = 0
+						break
+			if local_optimum == 0:
+				break
+	return current_makespan, evaluations, valid_heads, valid_tails
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline void _block_makespan(const int[:,:] processing_times, int[:,::1] e, int[:,::1] q, int[:,::1] f,
+								 int[::1] ms, int[::1] block, int block_size, int i, int sequence_length,
+								 int num_machines, int bound) noexcept nogil:
+	"""Makespan (ms[i]) with the block inserted in position i, using row i of f.
+
+	The completion times of the block jobs overwrite the same row. If
+	bound > 0, stop as soon as the partial makespan is greater than bound.
+	"""
+	cdef int j, k, job, tmp
+	cdef int iq = sequence_length + 1 - i
+
+	for j in range(1, num_machines + 1):
+		f[i, j] = e[i - 1, j]
+	f[i, 0] = 0
+	for k in range(block_size):
+		job = block[k] - 1
+		for j in range(1, num_machines + 1):
+			if f[i, j - 1] > f[i, j]:
+				f[i, j] = f[i, j - 1] + processing_times[job, j - 1]
+			else:
+				f[i, j] = f[i, j] + processing_times[job, j - 1]
+
+	ms[i] = 0
+	for j in range(1, num_machines + 1):
+		tmp = f[i, j] + q[iq, j]
+		if tmp > ms[i]:
+			ms[i] = tmp
+			if bound > 0 and tmp > bound:
+				return
+
+
+cdef inline unsigned long long _next_random(unsigned long long* state) noexcept nogil:
+	"""Splitmix64 pseudo random number generator."""
+	cdef unsigned long long z
+	state[0] += 0x9E3779B97F4A7C15ULL
+	z = state[0]
+	z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL
+	z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL
+	return z ^ (z >> 31)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _shuffle(int[::1] values, int length, unsigned long long* state) noexcept nogil:
+	"""Fisher-Yates shuffle of the first length values."""
+	cdef int i, j, tmp
+	for i in range(length - 1, 0, -1):
+		j = <int>(_next_random(state) % <unsigned long long>(i + 1))
+		tmp = values[i]
+		values[i] = values[j]
+		values[j] = tmp
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef int insert_job(int[::1] sequence, int sequence_length, int position, int job):
+	"""Insert a job in place into a preallocated sequence buffer.
+
+	Arguments:
+		sequence: Numpy array with room for at least sequence_length + 1 jobs.
+		sequence_length: Number of jobs currently in the buffer (int).
+		position: Index where the job is inserted (int).
+		job: Job to insert (int).
+
+	Returns:
+		sequence_length: New number of jobs in the buffer.
+	"""
+	if sequence_length >= sequence.shape[0] or position < 0 or position > sequence_length:
+		raise IndexError("invalid insertion position")
+	return _insert(sequence, sequence_length, position, job)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef int remove_job(int[::1] sequence, int sequence_length, int job):
+	"""Remove a job in place from a preallocated sequence buffer.
+
+	Arguments:
+		sequence: Numpy array with the sequence in the first sequence_length elements.
+		sequence_length: Number of jobs currently in the buffer (int).
+		job: Job to remove (int).
+
+	Returns:
+		position: Index of the removed job or -1 if it is not in the sequence.
+	"""
+	return _remove(sequence, sequence_length, job)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _insert(int[::1] sequence, int sequence_length, int position, int job) noexcept nogil:
+	"""Insert the job at position (no checks) and return the new length."""
+	cdef int i
+	for i in range(sequence_length, position, -1):
+		sequence[i] = sequence[i - 1]
+	sequence[position] = job
+	return sequence_length + 1
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int _remove(int[::1] sequence, int sequence_length, int job) noexcept nogil:
+	"""Remove the job and return its position (-1 if not found)."""
+	cdef int i, position
+	position = -1
+	for i in range(sequence_length):
+		if sequence[i] == job:
+			position = i
+			break
+	if position < 0:
+		return -1
+
+	for i in range(position, sequence_length - 1):
+		sequence[i] = sequence[i + 1]
+	return position
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef long long branch_and_bound(const int[:,:] processing_times, const int[:,::1] tails, int num_jobs,
+								 int num_machines, int[:,::1] completion, int[:,::1] children, int[:,::1] bounds,
+								 int[:,::1] levels, int[:,::1] machines, int[::1] best_sequence, int[::1] state,
+								 long long node_limit):
+	"""Depth first branch and bound for the makespan, resumable after node_limit nodes.
+
+	Nodes are partial sequences extended at the end. The children of a node
+	are sorted by bound: for each machine, the completion time of the child
+	plus the load of the other unscheduled jobs plus their smallest tail.
+	Children whose bound is not below the upper bound are pruned. The whole
+	search state is kept in the arrays, so the search continues where it
+	stopped in the next call.
+
+	Arguments:
+		processing_times: Numpy 2d array with processing times.
+		tails: Numpy 2d array with the time of each job on the machines after each machine.
+		num_jobs: Number of jobs (int).
+		num_machines: Number of machines (int).
+		completion: Numpy 2d array (num_jobs + 1, num_machines) with the completion
+		times of the partial sequence at each depth; row 0 holds the release times.
+		children: Numpy 2d array (num_jobs, num_jobs) with the children (job - 1)
+		of the node at each depth, sorted by bound.
+		bounds: Numpy 2d array (num_jobs, num_jobs) with the bounds of the children.
+		levels: Numpy 2d array (4, num_jobs); rows have the number of children at
+		each depth (-1 before the node is expanded), the next child at each depth,
+		the partial sequence (job - 1) and 1 for the jobs in it.
+		machines: Numpy 2d array (4, num_machines); row 0 has the load of the
+		unscheduled jobs and the other rows are workspace.
+		best_sequence: Numpy array that receives each improved sequence.
+		state: Numpy array with depth, upper bound, lower bound (stop when the
+		upper bound reaches it) and 1 once the search is finished.
+		node_limit: Maximum number of nodes in this call.
+
+	Returns:
+		nodes: Number of nodes explored in this call.
+	"""
+	cdef long long nodes = 0
+	cdef int depth, upper_bound, lower_bound, position, job, i, j
+	if state[3] > 0:
+		return 0
+	depth = state[0]
+	upper_bound = state[1]
+	lower_bound = state[2]
+
+	with nogil:
+		while nodes < node_limit:
+			if levels[0, depth] < 0:
+				_expand_node(processing_times, tails, num_jobs, num_machines, depth, completion,
+							 children, bounds, levels, machines)
+
+			position = levels[1, depth]
+			if (position >= levels[0, depth] or bounds[depth, position] >= upper_bound or
+					upper_bound <= lower_bound):
+				# Backtrack
+				levels[0, depth] = -1
+				if depth == 0 or upper_bound <= lower_bound:
+					state[3] = 1
+					break
+				depth -= 1
+				job = levels[2, depth]
+				levels[3, job] = 0
+				for j in range(num_machines):
+					machines[0, j] += processing_times[job, j]
+				levels[1, depth] += 1
+				continue
+
+			job = children[depth, position]
+			if depth == num_jobs - 1:
+				# Complete sequence better than the incumbent
+				upper_bound = bounds[depth, position]
+				for i in range(depth):
+					best_sequence[i] = levels[2, i] + 1
+				best_sequence[depth] = job + 1
+				levels[1, depth] += 1
+				continue
+
+			levels[2, depth] = job
+			levels[3, job] = 1
+			completion[depth + 1, 0] = completion[depth, 0] + processing_times[job, 0]
+			machines[0, 0] -= processing_times[job, 0]
+			for j in range(1, num_machines):
+				completion[depth + 1, j] = completion[depth + 1, j - 1]
+				if completion[depth, j] > completion[depth + 1, j]:
+					completion[depth + 1, j] = completion[depth, j]
+				completion[depth + 1, j] += processing_times[job, j]
+				machines[0, j] -= processing_times[job, j]
+			depth += 1
+			levels[0, depth] = -1
+			nodes += 1
+
+	state[0] = depth
+	state[1] = upper_bound
+	return nodes
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _expand_node(const int[:,:] processing_times, const int[:,::1] tails, int num_jobs, int num_machines,
+					   int depth, int[:,::1] completion, int[:,::1] children, int[:,::1] bounds,
+					   int[:,::1] levels, int[:,::1] machines) noexcept nogil:
+	"""Compute the bounds of the children of the node at depth and sort them (see branch_and_bound)."""
+	cdef int count, u, i, j, tail, previous, bound, value, other
+
+	# Smallest tail, its job and second smallest tail of the unscheduled jobs
+	for j in range(num_machines):
+		machines[1, j] = INT_MAX
+		machines[2, j] = -1
+		machines[3, j] = INT_MAX
+	for u in range(num_jobs):
+		if levels[3, u] > 0:
+			continue
+		for j in range(num_machines):
+			tail = tails[u, j]
+			if tail < machines[1, j]:
+				machines[3, j] = machines[1, j]
+				machines[1, j] = tail
+				machines[2, j] = u
+			elif tail < machines[3, j]:
+				machines[3, j] = tail
+	if depth == num_jobs - 1:
+		for j in range(num_machines):
+			machines[3, j] = 0
+
+	count = 0
+	for u in range(num_jobs):
+		if levels[3, u] > 0:
+			continue
+		previous = 0
+		bound = 0
+		for j in range(num_machines):
+			if completion[depth, j] > previous:
+				previous = completion[depth, j]
+			previous += processing_times[u, j]
+			other = machines[3, j] if machines[2, j] == u else machines[1, j]
+			value = previous + machines[0, j] - processing_times[u, j] + other
+			if value > bound:
+				bound = value
+
+		# Insertion sort by bound
+		i = count
+		while i > 0 and bounds[depth, i - 1] > bound:
+			bounds[depth, i] = bounds[depth, i - 1]
+			children[depth, i] = children[depth, i - 1]
+			i -= 1
+		bounds[depth, i] = bound
+		children[depth, i] = u
+		count += 1
+	levels[0, depth] = count
+	levels[1, depth] = 0
@@ -3,6 +3,43 @@ permutation-flowshop repository
 
 Build C binary code using Cython library
 """
+import os
+import sys
+import tempfile
+from distutils.ccompiler import new_compiler
 from distutils.core import setup
+from distutils.errors import CompileError, LinkError
+from distutils.extension import Extension
+from distutils.sysconfig import customize_compiler
 from Cython.Build import cythonize
-setup(ext_modules=cythonize('calculations.pyx'))
\ No newline at end of file
+
+# Source used to check that the compiler supports OpenMP
+OPENMP_TEST = "#include <omp.h>\nint main(void) { return omp_get_max_threads() > 0 ? 0 : 1; }\n"
+
+def openmp_flags():
+    """Return the OpenMP compiler flags, or an empty list if OpenMP is not available.
+
+    OpenMP is only used by the parallel (prange) kernels, which run serially
+    without it. Set the PFSP_NO_OPENMP environment variable to build without it.
+    """
+    if os.environ.get('PFSP_NO_OPENMP'):
+        return []
+    flag = '/openmp' if sys.platform == 'win32' else '-fopenmp'
+    compiler = new_compiler()
+    customize_compiler(compiler)
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'openmp_test.c')
+        with open(source, 'w') as f:
+            f.write(OPENMP_TEST)
+        try:
+            objects = compiler.compile([source], output_dir=directory, extra_postargs=[flag])
+            compiler.link_executable(objects, os.path.join(directory, 'openmp_test'), extra_postargs=[flag])
+        except (CompileError, LinkError):
+            print("OpenMP is not available, building the serial kernels only")
+            return []
+    return [flag]
+
+
+flags = openmp_flags()
+extensions = [Extension('calculations', ['calculations.pyx'], extra_compile_args=flags, extra_link_args=flags)]
+setup(ext_modules=cythonize(extensions))
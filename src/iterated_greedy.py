@@ -5,13 +5,25 @@ Main class for running the algorithm.
 """
 
 import math
+import os
 import random
+import time
 import numpy as np
-from datetime import datetime, timedelta
-from solution import Solution
+from solution import Solution, MAKESPAN
+from problem_instance import get_instance
 import local_search
 import constructive_heuristic
 import selection_methods
+import run_statistics
+from solution_cache import SolutionCache
+
+# Interval between clock checks in the main loop (nanoseconds)
+CLOCK_CHECK_NS = 1000000
+
+def computational_time(num_jobs, num_machines, runtime_parameter):
+    """Return the runtime in miliseconds proposed in the literature (n * m / 2 * parameter)."""
+    return num_jobs * (num_machines / 2) * runtime_parameter
+
 
 class IteratedGreedy(object):
     """Iterated Greedy Metaheuristic for the PFSP with makespan objective.
@@ -19,7 +31,9 @@ class IteratedGreedy(object):
     Class that implements the Iterated Greedy algorithm for the
     permutation flowshop problem with the objective of minimizing
     the makespan of the sequence. In the permutation problem, all
-    machines must have the same job processing sequence.
+    machines must have the same job processing sequence. The total
+    flowtime and total weighted tardiness can be minimized instead
+    (see objective).
 
     This class also implements a few variations of the original
     algorithm through the following parameters:
@@ -40,13 +54,62 @@ class IteratedGreedy(object):
         zero for random, one for tournament selection, two
         for fitness proportionate selection and three for
         stochastic universal sampling (int, default: 0)
+
+        local_search_method: Local search applied to complete solutions;
+        zero for insertion, one for swap, two for block insertion, three
+        for reference (RZ) local search with the best solution as reference
+        and four for variable neighborhood descent over insertion, swap and
+        block insertion. The partial solution search is always insertion (int, default: 0).
+
+        block_size: Number of consecutive jobs moved by block insertion (int, default: 2).
+
+        num_threads: Threads used to evaluate the insertion positions
+        of a job; only worth it for very large instances (int, default: 1).
+
+        bound_pruning: Abandon dominated insertion positions early, stop the
+        local search and the run when the makespan reaches the instance
+        lower bound (boolean, default: False).
+
+        objective: Objective to minimize; solution.MAKESPAN, FLOWTIME or
+        TARDINESS (the instance must have due dates). Other objectives
+        only support the insertion local search (int, default: MAKESPAN).
+
+        checkpoint_file: Path of the checkpoint saved every checkpoint_interval
+        iterations and at the end of the run; see save_checkpoint (default: None).
+        checkpoint_interval: Iterations between checkpoints (int, default: None).
+
+        instrumentation: Collect a RunStatistics object with the time of each
+        phase, kernel calls, acceptance outcomes and a trace of the best
+        objective value; available as statistics after run (boolean, default: False).
+        on_improvement: Function called with this object whenever the best
+        solution improves, including the initial solution (default: None).
+
+        cache_size: Keep the local search result of up to cache_size
+        rebuilt sequences and reuse it when a sequence is rebuilt again,
+        skipping the local search; the cache is available as cache after
+        run, with its hit rate. Not used with the reference local search
+        and not saved in checkpoints (int, default: None).
+
+    Besides the time limit, the run can be stopped by the following
+    criteria, which are disabled when None (default):
+
+        max_iterations: Maximum number of iterations (int).
+        max_evaluations: Maximum number of makespan evaluations, counting
+        each insertion position evaluated as one (int).
+        target_makespan: Stop when the best objective value (makespan) is less or equal (int).
+        max_iterations_without_improvement: Stop after this number of
+        iterations without improving the best solution (int).
     """
 
-    def __init__(self, instance_processing_times):
+    def __init__(self, instance):
+        # Problem instance (processing times and statistics), which can be a
+        # ProblemInstance shared with other objects or a numpy 2d array
+        self.instance = get_instance(instance)
+
         # Create Solution object
-        self.current_solution = Solution(instance_processing_times)
-        self.new_solution = Solution(instance_processing_times)
-        self.best_solution = Solution(instance_processing_times)
+        self.current_solution = Solution(self.instance)
+        self.new_solution = Solution(self.instance)
+        self.best_solution = Solution(self.instance)
 
         # Standard algorithm params
         self.temperature_param = 0.4
@@ -57,67 +120,335 @@ class IteratedGreedy(object):
         self.local_search_partial_solution = False
         self.selection_method = 0
         self.tournament_size = 5
+        self.local_search_method = 0
+        self.block_size = 2
+        self.num_threads = 1
+        self.bound_pruning = False
+        self.objective = MAKESPAN
+        self.checkpoint_file = None
+        self.checkpoint_interval = None
+        self.instrumentation = False
+        self.on_improvement = None
+        self.statistics = None
+        self.cache_size = None
+        self.cache = None
+
+        # Stopping criteria (besides the time limit)
+        self.max_iterations = None
+        self.max_evaluations = None
+        self.target_makespan = None
+        self.max_iterations_without_improvement = None
+        self.iterations = 0
+        # Iteration of the last improvement of the best solution
+        self._last_improvement = 0
 
-    def run(self, runtime_in_miliseconds):
+    @property
+    def evaluations(self):
+        """Number of makespan evaluations in the last run (int)."""
+        return self.current_solution.evaluations + self.new_solution.evaluations
+
+    def run(self, runtime_in_miliseconds=None, initial_sequence=None, resume_from=None):
         """Run the Iterated Greedy algorithm.
 
+        The clock is read with a monotonic timer, and only about once every
+        CLOCK_CHECK_NS nanoseconds: the number of iterations between checks
+        is adjusted to the iteration speed.
+
         Arguments:
-            runtime_in_miliseconds: Time to run the algorithm in miliseconds.
+            runtime_in_miliseconds: Time to run the algorithm in miliseconds;
+            None to stop only with the other criteria (default: None).
+            initial_sequence: Start from this sequence (all jobs) instead of
+            NEH and the first local search (default: None).
+            resume_from: Path of a checkpoint to continue from; with the same
+            parameters the run follows the same trajectory as the run that
+            saved it. The iterations count from the checkpoint (default: None).
         """
+        if runtime_in_miliseconds is None and not self._has_stopping_criteria():
+            raise ValueError("a time limit or another stopping criterion is required")
+
         # 0) Define constant temperature and run time
-        self.iterations = 0
-        temperature = self._calculate_temperature()
-        time_limit = datetime.now() + timedelta(milliseconds=runtime_in_miliseconds)
+        start_ns = time.perf_counter_ns()
+        if runtime_in_miliseconds is None:
+            time_limit_ns = None
+        else:
+            time_limit_ns = start_ns + int(runtime_in_miliseconds * 1000000)
+        self._start_ns = start_ns
+        self._temperature = self._calculate_temperature()
+        self.statistics = run_statistics.RunStatistics() if self.instrumentation else None
+        for solution in (self.current_solution, self.new_solution, self.best_solution):
+            solution.num_threads = self.num_threads
+            solution.bound_pruning = self.bound_pruning
+            solution.objective = self.objective
+            solution.evaluations = 0
+            solution.kernel_calls = None if self.statistics is None else self.statistics.kernel_calls
+        self._create_cache()
+
+        if resume_from is not None:
+            self._load_checkpoint(resume_from)
+        else:
+            self.iterations = 0
+            # 1) First solution (NEH Heuristic + Local Search or initial sequence)
+            self._initial_solution(initial_sequence)
+            if self.statistics is not None:
+                self.statistics.add_initial_solution(time.perf_counter_ns() - start_ns)
+            self._best_improved(0)
+
+        check_interval = 1
+        next_check = 0
+        last_check_ns = start_ns
+        while not self._stopping_criteria_met():
+            if time_limit_ns is not None and self.iterations >= next_check:
+                now_ns = time.perf_counter_ns()
+                if now_ns >= time_limit_ns:
+                    break
+                # Adjust the number of iterations between clock checks
+                if now_ns - last_check_ns < CLOCK_CHECK_NS:
+                    check_interval *= 2
+                elif check_interval > 1:
+                    check_interval //= 2
+                next_check = self.iterations + check_interval
+                last_check_ns = now_ns
+
+            self._iteration()
+            self.iterations += 1
+            if (self.checkpoint_file is not None and self.checkpoint_interval and
+                    self.iterations % self.checkpoint_interval == 0):
+                self.save_checkpoint(self.checkpoint_file)
+
+        if self.checkpoint_file is not None:
+            self.save_checkpoint(self.checkpoint_file)
+        if self.statistics is not None:
+            self.statistics.elapsed_seconds = (time.perf_counter_ns() - start_ns) / 1e9
+            if self.cache is not None:
+                self.statistics.cache = self.cache.as_dict()
+
+    def save_checkpoint(self, file_name):
+        """Save the state needed to resume the run (see run) to a .npz file.
+
+        The checkpoint has the current and best sequences and objective
+        values, the iteration counters and the state of the random and
+        numpy random generators. The parameters are not saved. The file is
+        replaced atomically, so a run killed while saving keeps the
+        previous checkpoint.
 
-        # 1) First solution (NEH Heuristic + Local Search)
-        constructive_heuristic.NEH(self.current_solution, self.tie_breaking, self.neh_order_jobs)
-        local_search.insertion_neighborhood(self.current_solution, self.local_optimum, self.tie_breaking)
+        Arguments:
+            file_name: Path of the checkpoint file.
+        """
+        version, random_state, gauss = random.getstate()
+        name, keys, position, has_gauss, cached_gaussian = np.random.get_state()
+        state = {
+            'num_jobs': self.instance.num_jobs,
+            'objective': self.objective,
+            'current_sequence': self.current_solution.sequence,
+            'current_value': self.current_solution.objective_value,
+            'current_makespan': self.current_solution.makespan,
+            'best_sequence': self.best_solution.sequence,
+            'best_value': self.best_solution.objective_value,
+            'best_makespan': self.best_solution.makespan,
+            'iterations': self.iterations,
+            'last_improvement': self._last_improvement,
+            'evaluations': self.evaluations,
+            'random_version': version,
+            'random_state': np.array(random_state, dtype='int64'),
+            'random_gauss': np.nan if gauss is None else gauss,
+            'numpy_keys': keys,
+            'numpy_position': position,
+            'numpy_has_gauss': has_gauss,
+            'numpy_cached_gaussian': cached_gaussian,
+        }
+        temporary_file = file_name + ".tmp"
+        with open(temporary_file, 'wb') as f:
+            np.savez_compressed(f, **state)
+        os.replace(temporary_file, file_name)
+
+    def _load_checkpoint(self, file_name):
+        """Restore the solutions, counters and random generators from a checkpoint."""
+        with np.load(file_name) as state:
+            if int(state['num_jobs']) != self.instance.num_jobs or int(state['objective']) != self.objective:
+                raise ValueError("checkpoint is for another instance or objective")
+
+            for solution, name in ((self.current_solution, 'current'), (self.best_solution, 'best')):
+                solution.sequence = state[name + '_sequence']
+                solution.makespan = int(state[name + '_makespan'])
+                solution.objective_value = int(state[name + '_value'])
+            self.iterations = int(state['iterations'])
+            self._last_improvement = int(state['last_improvement'])
+            self.current_solution.evaluations = int(state['evaluations'])
+
+            gauss = float(state['random_gauss'])
+            random.setstate((int(state['random_version']), tuple(state['random_state'].tolist()),
+                             None if math.isnan(gauss) else gauss))
+            np.random.set_state(('MT19937', state['numpy_keys'], int(state['numpy_position']),
+                                 int(state['numpy_has_gauss']), float(state['numpy_cached_gaussian'])))
+
+    def _has_stopping_criteria(self):
+        """Return True if any stopping criterion besides time is set."""
+        return (self.max_iterations is not None or self.max_evaluations is not None or
+                self.target_makespan is not None or self.max_iterations_without_improvement is not None)
+
+    def _stopping_criteria_met(self):
+        """Return True if the run must stop (except for the time limit)."""
+        if self.max_iterations is not None and self.iterations >= self.max_iterations:
+            return True
+        if self.target_makespan is not None and self.best_solution.objective_value <= self.target_makespan:
+            return True
+        if (self.bound_pruning and self.objective == MAKESPAN and
+                self.best_solution.makespan <= self.instance.lower_bound):
+            return True
+        if self.max_evaluations is not None and self.evaluations >= self.max_evaluations:
+            return True
+        if (self.max_iterations_without_improvement is not None and
+                self.iterations - self._last_improvement >= self.max_iterations_without_improvement):
+            return True
+        return False
+
+    def _initial_solution(self, initial_sequence=None):
+        """Build the first solution (NEH and local search, or the given sequence) and save it as best."""
+        if initial_sequence is None:
+            constructive_heuristic.NEH(self.current_solution, self.tie_breaking, self.neh_order_jobs)
+            self._local_search(self.current_solution, self.current_solution.sequence)
+        else:
+            initial_sequence = np.asarray(initial_sequence, dtype='int32')
+            if not np.array_equal(np.sort(initial_sequence), np.arange(1, self.instance.num_jobs + 1)):
+                raise ValueError("the initial sequence must have each job exactly once")
+            self.current_solution.sequence = initial_sequence
+            self.current_solution.calculate_objective()
 
         # Save best solution and makespan
-        self.best_solution.sequence = self.current_solution.sequence.copy()
-        self.best_solution.makespan = self.current_solution.makespan
-
-        while datetime.now() < time_limit:
-
-            # 2) Destruction phase - create new solution without a group of jobs
-            removed_jobs = self._select_jobs_to_remove()
-            self.new_solution.sequence = [job for job in self.current_solution.sequence if job not in removed_jobs]
-
-            # 2.1) Local search on partial solution (optional)
-            if self.local_search_partial_solution:
-                local_search.insertion_neighborhood(self.new_solution, self.local_optimum, self.tie_breaking)
-
-            # 3) Construction phase
-            for job in removed_jobs:
-                # Insert in best position (also calculate makespan)
-                self.new_solution.insert_best_position(job, self.tie_breaking)
-
-            # 4) Local search on complete solution
-            local_search.insertion_neighborhood(self.new_solution, self.local_optimum, self.tie_breaking)
-
-            # 5) Acceptance Criteria
-            if self.new_solution.makespan < self.current_solution.makespan:
-                # Accept new solution
-                self.current_solution.sequence = self.new_solution.sequence.copy()
-                self.current_solution.makespan = self.new_solution.makespan
-
-                # Check if best solution
-                if self.current_solution.makespan < self.best_solution.makespan:
-                    self.best_solution.makespan = self.current_solution.makespan
-                    self.best_solution.sequence = self.current_solution.sequence.copy()
-
-            else:
-
-                # Metropolis acceptance criterion - Osman and Potts (1989)
-                diff = self.new_solution.makespan - self.current_solution.makespan
-                acceptance_criterion = math.exp(- diff / temperature)
-
-                if random.random() <= acceptance_criterion:
-                    # Accept new solution
-                    self.current_solution.sequence = self.new_solution.sequence.copy()
-                    self.current_solution.makespan = self.new_solution.makespan
-
-            self.iterations += 1
+        self.best_solution.sequence = self.current_solution.sequence
+        self._copy_values(self.current_solution, self.best_solution)
+
+    def _iteration(self):
+        """Destruction, construction, local search and acceptance (one iteration)."""
+        if self.statistics is not None:
+            self._instrumented_iteration()
+            return
+
+        removed_jobs = self._destruction()
+        if self.local_search_partial_solution:
+            self._partial_local_search()
+        self._construction(removed_jobs)
+        self._complete_local_search()
+        self._acceptance()
+
+    def _instrumented_iteration(self):
+        """Same as _iteration, adding the time of each phase to the statistics."""
+        clock = time.perf_counter_ns
+        start = clock()
+        removed_jobs = self._destruction()
+        destruction_end = clock()
+        if self.local_search_partial_solution:
+            self._partial_local_search()
+        partial_end = clock()
+        self._construction(removed_jobs)
+        construction_end = clock()
+        self._complete_local_search()
+        local_search_end = clock()
+        outcome = self._acceptance()
+        end = clock()
+        self.statistics.add_iteration((destruction_end - start, partial_end - destruction_end,
+                                       construction_end - partial_end, local_search_end - construction_end,
+                                       end - local_search_end), outcome)
+
+    def _destruction(self):
+        """2) Destruction phase - create new solution without a group of jobs."""
+        removed_jobs = self._select_jobs_to_remove()
+        self.new_solution.sequence = self.current_solution.sequence
+        for job in removed_jobs:
+            self.new_solution.remove_job(job)
+        return removed_jobs
+
+    def _partial_local_search(self):
+        """2.1) Local search on partial solution (optional)."""
+        local_search.insertion_neighborhood(self.new_solution, self.local_optimum, self.tie_breaking)
+
+    def _construction(self, removed_jobs):
+        """3) Construction phase."""
+        for job in removed_jobs:
+            # Insert in best position (also calculate makespan)
+            self.new_solution.insert_best_position(job, self.tie_breaking)
+
+    def _complete_local_search(self):
+        """4) Local search on the new solution, reusing the result of sequences in the cache."""
+        solution = self.new_solution
+        if self.cache is None:
+            self._local_search(solution, self.best_solution.sequence)
+            return
+
+        sequence = solution.sequence.copy()
+        key = self.cache.hash(sequence)
+        entry = self.cache.get(key, sequence)
+        if entry is None:
+            self._local_search(solution, self.best_solution.sequence)
+            self.cache.put(key, sequence, solution.sequence, solution.objective_value, solution.makespan)
+        else:
+            local_optimum, objective_value, makespan = entry
+            solution.sequence = local_optimum
+            solution.makespan = makespan
+            solution.objective_value = objective_value
+
+    def _acceptance(self):
+        """5) Acceptance Criteria; return the outcome (see run_statistics)."""
+        if self.new_solution.objective_value < self.current_solution.objective_value:
+            # Accept new solution
+            self.current_solution.sequence = self.new_solution.sequence
+            self._copy_values(self.new_solution, self.current_solution)
+
+            # Check if best solution
+            if self.current_solution.objective_value < self.best_solution.objective_value:
+                self._copy_values(self.current_solution, self.best_solution)
+                self.best_solution.sequence = self.current_solution.sequence
+                self._best_improved(self.iterations + 1)
+            return run_statistics.IMPROVED
+
+        # Metropolis acceptance criterion - Osman and Potts (1989)
+        diff = self.new_solution.objective_value - self.current_solution.objective_value
+        acceptance_criterion = math.exp(- diff / self._temperature)
+
+        if random.random() <= acceptance_criterion:
+            # Accept new solution
+            self.current_solution.sequence = self.new_solution.sequence
+            self._copy_values(self.new_solution, self.current_solution)
+            return run_statistics.ACCEPTED
+        return run_statistics.REJECTED
+
+    def _best_improved(self, iteration):
+        """Record an improvement of the best solution and call on_improvement."""
+        self._last_improvement = iteration
+        if self.statistics is not None:
+            elapsed = (time.perf_counter_ns() - self._start_ns) / 1e9
+            self.statistics.trace.append((elapsed, iteration, int(self.best_solution.objective_value)))
+        if self.on_improvement is not None:
+            self.on_improvement(self)
+
+    @staticmethod
+    def _copy_values(source, destination):
+        """Copy the makespan and objective value between solutions."""
+        destination.makespan = source.makespan
+        destination.objective_value = source.objective_value
+
+    def _create_cache(self):
+        """Create an empty cache for this run if cache_size is set (see SolutionCache)."""
+        if not self.cache_size or self.local_search_method == 3:
+            self.cache = None
+        elif (self.cache is not None and self.cache.num_jobs == self.instance.num_jobs and
+                self.cache.max_size == self.cache_size):
+            self.cache.clear()
+        else:
+            self.cache = SolutionCache(self.instance.num_jobs, self.cache_size)
+
+    def _local_search(self, solution, reference):
+        """Apply the local search selected by local_search_method to a complete solution."""
+        if self.local_search_method == 1:
+            local_search.swap_neighborhood(solution, self.local_optimum)
+        elif self.local_search_method == 2:
+            local_search.block_insertion_neighborhood(solution, self.block_size, self.local_optimum)
+        elif self.local_search_method == 3:
+            local_search.reference_neighborhood(solution, reference, self.tie_breaking)
+        elif self.local_search_method == 4:
+            local_search.variable_neighborhood_descent(solution, self.tie_breaking, self.block_size)
+        else:
+            local_search.insertion_neighborhood(solution, self.local_optimum, self.tie_breaking)
 
     def computational_time(self, runtime_parameter):
         """Return the runtime according to the number of jobs, machines and argument.
@@ -128,15 +459,12 @@ class IteratedGreedy(object):
         Arguments:
             runtime_parameter: Usually this param is 30, 60, 90 or 120 (int).
         """
-        tmp = self.current_solution.num_jobs * (self.current_solution.num_machines / 2)
-        return tmp * runtime_parameter
+        return computational_time(self.current_solution.num_jobs, self.current_solution.num_machines,
+                                  runtime_parameter)
 
     def _calculate_temperature(self):
         """Return the temperature for acceptance criteria."""
-        temperature = 0
-        for i in range(self.current_solution.num_jobs):
-            temperature += np.sum(self.current_solution.processing_times[i])
-
+        temperature = self.instance.total_processing_times.sum()
         div = self.current_solution.num_jobs * self.current_solution.num_machines * 10
         return self.temperature_param * (temperature / div)
 
@@ -160,14 +488,11 @@ class IteratedGreedy(object):
             weights[self.current_solution.sequence[0] - 1] = 0
             selected_jobs = selection_methods.stochastic_universal_sampling(weights, self.num_jobs_remove)
         else:
-            selected_jobs = random.sample(self.current_solution.sequence, self.num_jobs_remove)
+            selected_jobs = random.sample(self.current_solution.sequence.tolist(), self.num_jobs_remove)
         return selected_jobs
 
     def _selection_weight_function(self):
         """Calculate the weight for each job (wrt the probability of being removed)."""
         # weight for job i: (idle_time + processing_time)/processing_time
-        weights = np.empty(self.current_solution.num_jobs)
-        for i in range(self.current_solution.num_jobs):
-            _sum = np.sum(self.current_solution.processing_times[i])
-            weights[i] = (_sum + self.current_solution.idle_time[i])/_sum
-        return weights
\ No newline at end of file
+        total_processing_times = self.instance.total_processing_times
+        return (total_processing_times + self.current_solution.idle_time) / total_processing_times
\ No newline at end of file
@@ -4,34 +4,85 @@ permutation-flowshop repository
 Algorithms for local search.
 """
 
-from random import shuffle
-
 def insertion_neighborhood(solution, local_optimum=True, tie_breaking=False):
     """Insertion neighborhood local search algorithm.
 
+    Each job, in random order, is removed and inserted in the position with
+    minimum makespan. The search runs in the compiled module on the solution
+    buffer (see Solution.insertion_local_search).
+
+    Arguments:
+        solution: Solution object (class from solution module).
+        local_optimum: Repeat search until local opt (boolean, default: True).
+        tie_breaking: Use tie breaking mechanism (boolean, default: False).
+    """
+    solution.insertion_local_search(local_optimum, tie_breaking)
+
+
+def swap_neighborhood(solution, local_optimum=True):
+    """Swap neighborhood local search algorithm.
+
+    Pairs of jobs are interchanged while the makespan improves (first
+    improvement, see Solution.swap_local_search).
+
+    Arguments:
+        solution: Solution object (class from solution module).
+        local_optimum: Repeat search until local opt (boolean, default: True).
+    """
+    solution.swap_local_search(local_optimum)
+
+
+def block_insertion_neighborhood(solution, block_size=2, local_optimum=True):
+    """Block insertion neighborhood local search algorithm.
+
+    Each run of block_size consecutive jobs is removed and inserted in the
+    position with minimum makespan (see Solution.block_local_search).
+
     Arguments:
         solution: Solution object (class from solution module).
+        block_size: Number of consecutive jobs moved together (int, default: 2).
         local_optimum: Repeat search until local opt (boolean, default: True).
+    """
+    solution.block_local_search(block_size, local_optimum)
+
+
+def reference_neighborhood(solution, reference, tie_breaking=False):
+    """Reference (RZ) local search algorithm.
+
+    Jobs are removed in the order of the reference sequence and inserted in
+    the position with minimum makespan (see Solution.reference_local_search).
+
+    Arguments:
+        solution: Solution object (class from solution module).
+        reference: Sequence with the same jobs as solution, e.g. the best solution.
+        tie_breaking: Use tie breaking mechanism (boolean, default: False).
+    """
+    solution.reference_local_search(reference, tie_breaking)
+
+
+def variable_neighborhood_descent(solution, tie_breaking=False, block_size=2):
+    """Variable neighborhood descent with insertion, swap and block insertion.
+
+    The neighborhoods are searched in this order until a local optimum;
+    whenever one improves the makespan the descent restarts from insertion.
+    The result is a local optimum for the three neighborhoods.
+
+    Arguments:
+        solution: Solution object (class from solution module).
         tie_breaking: Use tie breaking mechanism (boolean, default: False).
+        block_size: Number of consecutive jobs in block insertion (int, default: 2).
     """
-    current_makespan = 0
-    improve = True
-
-    # If parameter local_optimum is true: repeat while solution is improved
-    while improve:
-        improve = False
-        # Select random elements without repetition - O(N) implementation
-        not_tested = solution.sequence.copy()
-        shuffle(not_tested)
-        for removed_job in not_tested:
-            solution.sequence.remove(removed_job)
-            # If first iteration then calculate makespan
-            if current_makespan == 0:
-                current_makespan = solution.calculate_makespan()
-            # Insert job in best position and check improvement
-            solution.insert_best_position(removed_job, tie_breaking)
-            if solution.makespan < current_makespan:
-                improve = True
-                current_makespan = solution.makespan
-        if local_optimum == False:
-            break
\ No newline at end of file
+    neighborhoods = [
+        lambda: solution.insertion_local_search(True, tie_breaking),
+        lambda: solution.swap_local_search(True),
+        lambda: solution.block_local_search(block_size, True),
+    ]
+    makespan = solution.calculate_makespan()
+    k = 0
+    while k < len(neighborhoods):
+        neighborhoods[k]()
+        if solution.makespan < makespan:
+            makespan = solution.makespan
+            k = 0 if k > 0 else 1
+        else:
+            k += 1
@@ -0,0 +1,399 @@
+"""
+permutation-flowshop repository
+
+Run several Iterated Greedy trajectories in parallel processes, either
+independently (multi-start) or cooperatively (island model), and solve
+batches of independent instances in a process pool.
+"""
+
+import os
+import queue
+import random
+import time
+import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from iterated_greedy import IteratedGreedy, computational_time
+from solution import Solution, MAKESPAN
+from problem_instance import ProblemInstance, get_instance
+
+# Instance attached from shared memory in each worker process
+_shared_memory = None
+_shared_instance = None
+
+
+def solve_batch(instances, runtimes=None, runtime_parameter=30, workers=None, seeds=None,
+                configurations=None, pool=None):
+    """Solve independent instances in a process pool and yield each result as it finishes.
+
+    Instances are dispatched longest budget first, so with many instances
+    the batch takes about sum(runtimes) / workers. The worker processes,
+    which import the compiled module once, are reused for all instances.
+
+    Arguments:
+        instances: List with ProblemInstance objects or processing times.
+        runtimes: List with the time budget of each instance in miliseconds
+        (default: computational_time with runtime_parameter).
+        runtime_parameter: Parameter for the default budgets (int, default: 30).
+        workers: Number of worker processes; 1 solves the instances in this
+        process (int, default: number of cores).
+        seeds: List with the seed of each instance (default: None).
+        configurations: Dict with IteratedGreedy attributes for all instances,
+        or list with one dict per instance (default: None).
+        pool: ProcessPoolExecutor to use (and keep) instead of creating one,
+        e.g. to reuse the workers for several batches (default: None).
+
+    Yields:
+        result: Dict with index (position in instances), sequence,
+        objective_value, makespan, iterations, evaluations, runtime_ms
+        and elapsed_seconds.
+    """
+    instances = [get_instance(instance) for instance in instances]
+    if runtimes is None:
+        runtimes = [computational_time(instance.num_jobs, instance.num_machines, runtime_parameter)
+                    for instance in instances]
+    if seeds is None:
+        seeds = [None] * len(instances)
+    if configurations is None or isinstance(configurations, dict):
+        configurations = [configurations if configurations else dict()] * len(instances)
+
+    # Longest budget first
+    order = sorted(range(len(instances)), key=lambda i: runtimes[i], reverse=True)
+    tasks = [(i, instances[i], runtimes[i], seeds[i], configurations[i]) for i in order]
+
+    workers = workers if workers else os.cpu_count()
+    if pool is None and workers == 1:
+        # Seeding is per task, so restore the generators of the caller
+        states = random.getstate(), np.random.get_state()
+        for task in tasks:
+            try:
+                result = _solve_instance(*task)
+            finally:
+                random.setstate(states[0])
+                np.random.set_state(states[1])
+            yield result
+        return
+
+    own_pool = pool is None
+    if own_pool:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    futures = list()
+    try:
+        futures = [pool.submit(_solve_instance, *task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        if own_pool:
+            pool.shutdown(wait=True, cancel_futures=True)
+        else:
+            for future in futures:
+                future.cancel()
+
+
+class ParallelIteratedGreedy(object):
+    """Multi-start Iterated Greedy with independent trajectories in a process pool.
+
+    Each worker process runs its own IteratedGreedy object with a different
+    seed and, optionally, different hyperparameters. The processing times
+    are placed in shared memory once and attached read-only by the workers,
+    so the instance is not pickled for each trajectory.
+
+    Attributes:
+        workers: Number of worker processes (int, default: number of cores).
+        seed: Base seed, worker i uses seed + i (int, default: None).
+        configurations: List of dicts with IteratedGreedy attributes for each
+        worker, e.g. {'tie_breaking': True, 'selection_method': 1}. The list is
+        cycled if it is shorter than the number of workers (default: [{}]).
+        best_solution: Best Solution found by all trajectories.
+        iterations: Total number of iterations of all trajectories (int).
+        results: List with (objective value, iterations, configuration) of each
+        worker; the objective value is the makespan unless the configuration
+        sets another objective.
+    """
+
+    def __init__(self, instance, workers=None):
+        self.instance = get_instance(instance)
+        self.processing_times = self.instance.processing_times
+        self.best_solution = Solution(self.instance)
+
+        self.workers = workers if workers else os.cpu_count()
+        self.seed = None
+        self.configurations = [dict()]
+        self.iterations = 0
+        self.results = list()
+
+    def run(self, runtime_in_miliseconds):
+        """Run the trajectories and keep the best solution.
+
+        Arguments:
+            runtime_in_miliseconds: Time to run each trajectory in miliseconds.
+
+        Returns:
+            best_solution: Best Solution found by all workers.
+        """
+        tasks = list()
+        for i in range(self.workers):
+            seed = None if self.seed is None else self.seed + i
+            configuration = self.configurations[i % len(self.configurations)]
+            tasks.append((runtime_in_miliseconds, seed, configuration))
+
+        results = _map_shared(self.instance, _run_trajectory, tasks, self.workers)
+
+        self.results = list()
+        self.iterations = 0
+        for sequence, value, iterations, configuration in results:
+            self.results.append((value, iterations, configuration))
+            self.iterations += iterations
+        _set_best_solution(self.best_solution, results)
+        return self.best_solution
+
+
+class IslandIteratedGreedy(object):
+    """Cooperative Iterated Greedy with periodic migration between islands.
+
+    Each island is an IteratedGreedy object running in its own process.
+    Islands are connected in a ring: every migration_interval iterations
+    (or migration_time miliseconds, whichever comes first) an island
+    publishes its best solution in shared memory and reads the best solution
+    of the previous island. If the incoming solution is better than its
+    current_solution, the island adopts it and continues from there.
+
+    Attributes:
+        islands: Number of islands, one process each (int, default: number of cores).
+        migration_interval: Iterations between migrations (int, default: 50).
+        migration_time: Miliseconds between migrations; None to use only
+        the iteration interval (int, default: None).
+        seed: Base seed, island i uses seed + i (int, default: None).
+        configurations: List of dicts with IteratedGreedy attributes for each
+        island, cycled if shorter than the number of islands (default: [{}]).
+        best_solution: Best Solution found by all islands.
+        iterations: Total number of iterations of all islands (int).
+        migrations: Number of immigrants adopted by all islands (int).
+        results: List with (objective value, iterations, configuration) of each island.
+    """
+
+    def __init__(self, instance, islands=None):
+        self.instance = get_instance(instance)
+        self.processing_times = self.instance.processing_times
+        self.best_solution = Solution(self.instance)
+
+        self.islands = islands if islands else os.cpu_count()
+        self.migration_interval = 50
+        self.migration_time = None
+        self.seed = None
+        self.configurations = [dict()]
+        self.iterations = 0
+        self.migrations = 0
+        self.results = list()
+
+    def run(self, runtime_in_miliseconds):
+        """Run all islands and keep the best solution.
+
+        Arguments:
+            runtime_in_miliseconds: Time to run each island in miliseconds.
+
+        Returns:
+            best_solution: Best Solution found by all islands.
+        """
+        num_jobs = self.best_solution.num_jobs
+        shm = shared_memory.SharedMemory(create=True, size=self.processing_times.nbytes)
+        processes = list()
+        try:
+            buffer = np.ndarray(self.processing_times.shape, dtype='int32', buffer=shm.buf)
+            buffer[:] = self.processing_times
+            # One row per island with its best sequence, and its objective value
+            # (64 bit, for flowtime and tardiness) with a flag set once published;
+            # both are protected by the lock of the sequences array
+            elite = multiprocessing.Array('i', self.islands * num_jobs)
+            elite_values = multiprocessing.RawArray('q', self.islands * 2)
+            results_queue = multiprocessing.Queue()
+
+            for i in range(self.islands):
+                seed = None if self.seed is None else self.seed + i
+                configuration = self.configurations[i % len(self.configurations)]
+                process = multiprocessing.Process(
+                    target=_run_island,
+                    args=(i, self.islands, shm.name, self.processing_times.shape, self.instance.due_dates,
+                          self.instance.weights, elite, elite_values, results_queue, runtime_in_miliseconds, seed,
+                          configuration, self.migration_interval, self.migration_time))
+                process.start()
+                processes.append(process)
+
+            results = _collect_results(results_queue, processes)
+        finally:
+            for process in processes:
+                process.join()
+            shm.close()
+            shm.unlink()
+
+        self.results = list()
+        self.iterations = 0
+        self.migrations = 0
+        for sequence, value, iterations, migrations, configuration in results:
+            self.results.append((value, iterations, configuration))
+            self.iterations += iterations
+            self.migrations += migrations
+        _set_best_solution(self.best_solution, [(r[0], r[1], r[4]) for r in results])
+        return self.best_solution
+
+
+class _Island(IteratedGreedy):
+    """IteratedGreedy that exchanges its best solution with the previous island."""
+
+    def __init__(self, instance, index, num_islands, elite, elite_values, migration_interval, migration_time):
+        super().__init__(instance)
+        self.migrations = 0
+        self._index = index
+        self._source = (index - 1) % num_islands
+        self._elite_lock = elite.get_lock()
+        self._elite = np.frombuffer(elite.get_obj(), dtype='int32').reshape(num_islands, -1)
+        # Published flag and objective value of each island
+        self._elite_values = np.frombuffer(elite_values, dtype='int64').reshape(num_islands, 2)
+        self._migration_interval = migration_interval
+        self._migration_time_ns = None if migration_time is None else int(migration_time * 1e6)
+        self._iterations_since_migration = 0
+        self._last_migration_ns = time.perf_counter_ns()
+
+    def _iteration(self):
+        super()._iteration()
+        self._iterations_since_migration += 1
+
+        if self._iterations_since_migration >= self._migration_interval:
+            self._migrate()
+        elif self._migration_time_ns is not None:
+            if time.perf_counter_ns() - self._last_migration_ns >= self._migration_time_ns:
+                self._migrate()
+
+    def _migrate(self):
+        """Publish the best solution and adopt the incoming one if it is better."""
+        with self._elite_lock:
+            self._elite[self._index] = self.best_solution.sequence
+            self._elite_values[self._index] = (1, self.best_solution.objective_value)
+            published, incoming_value = self._elite_values[self._source]
+            if published and incoming_value < self.current_solution.objective_value:
+                self.current_solution.sequence = self._elite[self._source]
+                self.current_solution.calculate_objective()
+                self.migrations += 1
+
+        if self.current_solution.objective_value < self.best_solution.objective_value:
+            self._copy_values(self.current_solution, self.best_solution)
+            self.best_solution.sequence = self.current_solution.sequence
+            self._best_improved(self.iterations + 1)
+
+        self._iterations_since_migration = 0
+        self._last_migration_ns = time.perf_counter_ns()
+
+
+def _run_island(index, num_islands, name, shape, due_dates, weights, elite, elite_values, results_queue,
+                runtime_in_miliseconds, seed, configuration, migration_interval, migration_time):
+    """Run one island in its own process and put the result in the queue."""
+    _attach_shared_memory(name, shape, due_dates, weights)
+    _seed(seed)
+    ig = _Island(_shared_instance, index, num_islands, elite, elite_values, migration_interval, migration_time)
+    _configure(ig, configuration)
+    ig.run(runtime_in_miliseconds)
+    results_queue.put((ig.best_solution.sequence.tolist(), int(ig.best_solution.objective_value),
+                       ig.iterations, ig.migrations, configuration))
+
+
+def _collect_results(results_queue, processes):
+    """Get one result per process from the queue; fail if a process dies."""
+    results = list()
+    while len(results) < len(processes):
+        try:
+            results.append(results_queue.get(timeout=1.0))
+        except queue.Empty:
+            for process in processes:
+                if process.exitcode is not None and process.exitcode != 0:
+                    raise RuntimeError("island process exited with code {}".format(process.exitcode))
+    return results
+
+
+def _map_shared(instance, function, tasks, workers):
+    """Call function(*task) for each task in a process pool.
+
+    The processing times are copied to shared memory and made available
+    to the function as the module variable _shared_instance (ProblemInstance),
+    together with the due dates and weights of the instance.
+
+    Returns:
+        results: List with the return value for each task (same order).
+    """
+    processing_times = instance.processing_times
+    shm = shared_memory.SharedMemory(create=True, size=processing_times.nbytes)
+    try:
+        buffer = np.ndarray(processing_times.shape, dtype='int32', buffer=shm.buf)
+        buffer[:] = processing_times
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared_memory,
+                                 initargs=(shm.name, processing_times.shape, instance.due_dates,
+                                           instance.weights)) as pool:
+            futures = [pool.submit(function, *task) for task in tasks]
+            return [future.result() for future in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _attach_shared_memory(name, shape, due_dates=None, weights=None):
+    """Worker initializer: map the shared processing times as a read-only array."""
+    global _shared_memory, _shared_instance
+    _shared_memory = shared_memory.SharedMemory(name=name)
+    processing_times = np.ndarray(shape, dtype='int32', buffer=_shared_memory.buf)
+    processing_times.flags.writeable = False
+    _shared_instance = ProblemInstance(processing_times, due_dates, weights)
+
+
+def _set_best_solution(solution, results):
+    """Set the solution to the best (sequence, value, ..., configuration) result."""
+    best = min(results, key=lambda result: result[1])
+    solution.objective = best[-1].get('objective', MAKESPAN)
+    solution.sequence = best[0]
+    solution.calculate_objective()
+
+
+def _seed(seed):
+    """Seed the random number generators of this process.
+
+    Without a seed they are seeded from the operating system: forked
+    workers start with a copy of the parent state and would otherwise
+    produce the same random numbers.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def _configure(ig, configuration):
+    """Set the IteratedGreedy parameters given in the configuration dict."""
+    for name, value in configuration.items():
+        if not hasattr(ig, name):
+            raise AttributeError("IteratedGreedy has no parameter '{}'".format(name))
+        setattr(ig, name, value)
+
+
+def _run_trajectory(runtime_in_miliseconds, seed, configuration):
+    """Run one independent trajectory in a worker process."""
+    _seed(seed)
+    ig = IteratedGreedy(_shared_instance)
+    _configure(ig, configuration)
+    ig.run(runtime_in_miliseconds)
+    return ig.best_solution.sequence.tolist(), int(ig.best_solution.objective_value), ig.iterations, configuration
+
+
+def _solve_instance(index, instance, runtime_in_miliseconds, seed, configuration):
+    """Run IteratedGreedy on one instance of a batch (see solve_batch)."""
+    _seed(seed)
+    ig = IteratedGreedy(instance)
+    _configure(ig, configuration)
+    start = time.perf_counter()
+    ig.run(runtime_in_miliseconds)
+    return {
+        'index': index,
+        'sequence': ig.best_solution.sequence.tolist(),
+        'objective_value': int(ig.best_solution.objective_value),
+        'makespan': int(ig.best_solution.makespan),
+        'iterations': ig.iterations,
+        'evaluations': ig.evaluations,
+        'runtime_ms': runtime_in_miliseconds,
+        'elapsed_seconds': time.perf_counter() - start,
+    }
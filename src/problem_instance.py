@@ -0,0 +1,193 @@
+"""
+permutation-flowshop repository
+
+Class for holding the processing times of an instance and the
+statistics used by the heuristics, computed only once.
+"""
+
+import numpy as np
+
+class ProblemInstance(object):
+    """Processing times and precomputed statistics of a flowshop instance.
+
+    The statistics are computed with vectorized numpy operations when the
+    object is created. Solution, IteratedGreedy and the NEH orderings accept
+    a ProblemInstance, so several objects for the same instance share it.
+
+    Jobs can be added and removed later (see add_jobs and remove_job). The
+    processing times and job statistics are kept in buffers with room for
+    capacity jobs and the attributes are views on their first num_jobs rows;
+    the buffers only grow (doubling) when they are full. Only the statistics
+    of the added or moved jobs and the machine loads are updated, and the
+    lower bound is computed again when it is next read. Solutions for this
+    instance must call Solution.update_instance after these changes.
+
+    Attributes:
+        processing_times: Numpy 2d int32 array (jobs x machines).
+        num_jobs: Number of jobs (int).
+        num_machines: Number of machines (int).
+        capacity: Number of jobs that fit in the buffers (int).
+        total_processing_times: Numpy array with the sum of each job.
+        mean_processing_times: Numpy array with the mean of each job.
+        std_processing_times: Numpy array with the standard deviation of each job.
+        machine_loads: Numpy array with the sum of each machine.
+        lower_bound: Machine and job based lower bound for the makespan (int).
+        due_dates: Numpy int32 array with the due date of each job, required
+        for the tardiness objective (default: None).
+        weights: Numpy int32 array with the tardiness weight of each job (default: ones).
+    """
+
+    def __init__(self, instance_processing_times, due_dates=None, weights=None, capacity=None):
+        processing_times = np.ascontiguousarray(instance_processing_times, dtype='int32')
+        self.num_jobs, self.num_machines = processing_times.shape
+        if capacity is not None and capacity > self.num_jobs:
+            # Reserve room for jobs added later
+            self._buffer = _resized(processing_times, capacity)
+        else:
+            self._buffer = processing_times
+
+        self._due_dates = None
+        if due_dates is not None:
+            self._due_dates = np.zeros(self.capacity, dtype='int32')
+            self._due_dates[:self.num_jobs] = _job_array(due_dates, self.num_jobs, "due_dates")
+        self._weights = np.ones(self.capacity, dtype='int32')
+        if weights is not None:
+            self._weights[:self.num_jobs] = _job_array(weights, self.num_jobs, "weights")
+
+        # Statistics of each job (same rows as the processing times buffer)
+        self._totals = np.zeros(self.capacity, dtype='int64')
+        self._means = np.zeros(self.capacity, dtype='float64')
+        self._stds = np.zeros(self.capacity, dtype='float64')
+        self.machine_loads = np.zeros(self.num_machines, dtype='int64')
+        self._add_statistics(0, self.num_jobs)
+        self._set_views()
+
+    @property
+    def capacity(self):
+        """Number of jobs that fit in the processing times buffer (int)."""
+        return self._buffer.shape[0]
+
+    @property
+    def lower_bound(self):
+        """Machine and job based lower bound for the makespan (int)."""
+        if self._lower_bound is None:
+            self._lower_bound = _lower_bound(self.processing_times.astype('int64'),
+                                             self.total_processing_times, self.machine_loads)
+        return self._lower_bound
+
+    def add_jobs(self, processing_times, due_dates=None, weights=None):
+        """Append jobs to the instance and update the statistics.
+
+        Arguments:
+            processing_times: Numpy 2d array (new jobs x machines).
+            due_dates: Due date of each new job; required if and only if
+            the instance has due dates (default: None).
+            weights: Tardiness weight of each new job (default: ones).
+
+        Returns:
+            jobs: List with the numbers of the new jobs.
+        """
+        processing_times = np.asarray(processing_times, dtype='int32').reshape(-1, self.num_machines)
+        count = processing_times.shape[0]
+        if (due_dates is None) != (self._due_dates is None):
+            raise ValueError("due dates must be given for all jobs or for none")
+
+        if self.num_jobs + count > self.capacity:
+            self._reserve(max(2 * self.capacity, self.num_jobs + count))
+        first, last = self.num_jobs, self.num_jobs + count
+        self._buffer[first:last] = processing_times
+        if due_dates is not None:
+            self._due_dates[first:last] = _job_array(due_dates, count, "due_dates")
+        self._weights[first:last] = 1 if weights is None else _job_array(weights, count, "weights")
+        self._add_statistics(first, last)
+        self.num_jobs = last
+        self._set_views()
+        return list(range(first + 1, last + 1))
+
+    def remove_job(self, job):
+        """Remove a job; the last job takes its number.
+
+        Arguments:
+            job: Job to be removed (int).
+
+        Returns:
+            moved_job: Previous number of the job that is now numbered job,
+            or None if the removed job was the last one.
+        """
+        if not 1 <= job <= self.num_jobs:
+            raise ValueError("job {} is not in the instance".format(job))
+        last = self.num_jobs
+        self.machine_loads -= self._buffer[job - 1]
+        self._buffer[job - 1] = self._buffer[last - 1]
+        for statistic in (self._totals, self._means, self._stds):
+            statistic[job - 1] = statistic[last - 1]
+        if self._due_dates is not None:
+            self._due_dates[job - 1] = self._due_dates[last - 1]
+        self._weights[job - 1] = self._weights[last - 1]
+        self.num_jobs -= 1
+        self._set_views()
+        return last if job != last else None
+
+    def _reserve(self, capacity):
+        """Move the buffers to new arrays with room for capacity jobs."""
+        self._buffer = _resized(self._buffer, capacity)
+        self._weights = _resized(self._weights, capacity)
+        self._totals = _resized(self._totals, capacity)
+        self._means = _resized(self._means, capacity)
+        self._stds = _resized(self._stds, capacity)
+        if self._due_dates is not None:
+            self._due_dates = _resized(self._due_dates, capacity)
+
+    def _add_statistics(self, first, last):
+        """Compute the statistics of the jobs in rows first to last - 1 and add them to the machine loads."""
+        times = self._buffer[first:last].astype('int64')
+        self._totals[first:last] = times.sum(axis=1)
+        self._means[first:last] = times.mean(axis=1)
+        self._stds[first:last] = times.std(axis=1)
+        self.machine_loads += times.sum(axis=0)
+
+    def _set_views(self):
+        """Set the views on the buffers (no copies) after the jobs changed."""
+        self.processing_times = self._buffer[:self.num_jobs]
+        self.due_dates = None if self._due_dates is None else self._due_dates[:self.num_jobs]
+        self.weights = self._weights[:self.num_jobs]
+        self.total_processing_times = self._totals[:self.num_jobs]
+        self.mean_processing_times = self._means[:self.num_jobs]
+        self.std_processing_times = self._stds[:self.num_jobs]
+        self._lower_bound = None
+
+
+def get_instance(instance):
+    """Return the argument if it is a ProblemInstance or create one from processing times."""
+    if isinstance(instance, ProblemInstance):
+        return instance
+    return ProblemInstance(instance)
+
+
+def _job_array(values, num_jobs, name):
+    """Return values as a contiguous int32 array with one element per job."""
+    array = np.ascontiguousarray(values, dtype='int32')
+    if array.shape != (num_jobs,):
+        raise ValueError("{} must have one value for each of the {} jobs".format(name, num_jobs))
+    return array
+
+
+def _resized(array, capacity):
+    """Return a copy of the array with room for capacity rows (new rows are zero)."""
+    resized = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    resized[:array.shape[0]] = array
+    return resized
+
+
+def _lower_bound(processing_times, total_processing_times, machine_loads):
+    """Lower bound on the makespan (Taillard, 1993).
+
+    For each machine: the minimum time before a job can start on it, plus its
+    load, plus the minimum time after it. Also the longest job.
+    """
+    if processing_times.shape[0] == 0:
+        return 0
+    heads = np.cumsum(processing_times, axis=1) - processing_times
+    tails = np.cumsum(processing_times[:, ::-1], axis=1)[:, ::-1] - processing_times
+    machine_bounds = heads.min(axis=0) + machine_loads + tails.min(axis=0)
+    return int(max(machine_bounds.max(), total_processing_times.max()))
@@ -0,0 +1,164 @@
+"""
+permutation-flowshop repository
+
+Rolling horizon scheduling: keep a live schedule for jobs that
+arrive over time and improve it with Iterated Greedy between arrivals.
+"""
+
+import numpy as np
+import local_search
+from iterated_greedy import IteratedGreedy
+from problem_instance import ProblemInstance
+
+class RollingHorizonScheduler(object):
+    """Live schedule for a stream of arriving jobs.
+
+    The instance only holds the jobs that have not started (pending jobs).
+    New jobs are inserted in the best position of the live schedule, and
+    jobs that start are frozen: they leave the instance and their completion
+    times become the release times of the machines, so pending jobs are
+    always scheduled after them. Between arrivals, improve runs Iterated
+    Greedy for a bounded time starting from the live schedule (not NEH).
+
+    The processing times are appended to a preallocated buffer and started
+    jobs are swapped with the last pending job, so the instance is never
+    rebuilt. Jobs are identified by the ids returned by add_jobs; their
+    numbers in the instance change when other jobs start.
+
+    Attributes:
+        instance: ProblemInstance with the pending jobs.
+        iterated_greedy: IteratedGreedy used between arrivals; its parameters
+        (e.g. tie_breaking or objective) can be changed at any time.
+        time_slice: Default runtime of improve in miliseconds (int, default: 100).
+        started_jobs: List with (job id, completion time) of the started jobs.
+        release_times: Numpy array with the time each machine finishes the started jobs.
+
+    Example:
+        scheduler = RollingHorizonScheduler(num_machines=5)
+        scheduler.add_jobs(processing_times)
+        scheduler.improve()
+        scheduler.start_jobs(2)
+    """
+
+    def __init__(self, num_machines, capacity=256, due_dates=False):
+        """Create an empty schedule.
+
+        Arguments:
+            num_machines: Number of machines (int).
+            capacity: Number of pending jobs reserved in the buffers (int, default: 256).
+            due_dates: Jobs have due dates, required by the tardiness
+            objective (boolean, default: False).
+        """
+        self.instance = ProblemInstance(np.zeros((0, num_machines), dtype='int32'),
+                                        np.zeros(0, dtype='int32') if due_dates else None,
+                                        capacity=capacity)
+        self.iterated_greedy = IteratedGreedy(self.instance)
+        self.time_slice = 100
+        self.started_jobs = list()
+        self.release_times = np.zeros(num_machines, dtype='int64')
+        # Id of each pending job (index is the job number - 1)
+        self._job_ids = list()
+        self._next_id = 0
+
+    @property
+    def solution(self):
+        """Live Solution (numbers of the pending jobs in the instance)."""
+        return self.iterated_greedy.best_solution
+
+    @property
+    def sequence(self):
+        """List with the ids of the pending jobs in the live schedule."""
+        return [self._job_ids[job - 1] for job in self.solution.sequence.tolist()]
+
+    @property
+    def objective_value(self):
+        """Objective value of the pending jobs (makespan by default)."""
+        return self.solution.objective_value
+
+    def add_jobs(self, processing_times, due_dates=None, weights=None):
+        """Insert new jobs in the best positions of the live schedule.
+
+        Arguments:
+            processing_times: Numpy 2d array (new jobs x machines).
+            due_dates: Due date of each new job (default: None).
+            weights: Tardiness weight of each new job (default: ones).
+
+        Returns:
+            ids: List with the id of each new job.
+        """
+        jobs = self.instance.add_jobs(processing_times, due_dates, weights)
+        ids = list(range(self._next_id, self._next_id + len(jobs)))
+        self._next_id += len(jobs)
+        self._job_ids.extend(ids)
+
+        self._update_solutions()
+        for job in jobs:
+            self.solution.insert_best_position(job, self.iterated_greedy.tie_breaking)
+        return ids
+
+    def start_jobs(self, count=1):
+        """Freeze the first jobs of the live schedule, which started processing.
+
+        Arguments:
+            count: Number of jobs that started (int, default: 1).
+
+        Returns:
+            ids: List with the ids of the started jobs.
+        """
+        sequence = self.solution.sequence.tolist()
+        if count > len(sequence):
+            raise ValueError("only {} jobs are pending".format(len(sequence)))
+
+        started_ids = list()
+        for job in sequence[:count]:
+            # Completion time on each machine after the previous started jobs
+            processing_times = self.instance.processing_times[job - 1].astype('int64')
+            cumulative = np.cumsum(processing_times)
+            start = np.maximum.accumulate(self.release_times - (cumulative - processing_times))
+            self.release_times = cumulative + start
+            started_ids.append(self._job_ids[job - 1])
+            self.started_jobs.append((started_ids[-1], int(self.release_times[-1])))
+        pending_ids = [self._job_ids[job - 1] for job in sequence[count:]]
+
+        # Remove the started jobs from the instance (the last job takes the number)
+        for job_id in started_ids:
+            job = self._job_ids.index(job_id) + 1
+            moved_job = self.instance.remove_job(job)
+            if moved_job is not None:
+                self._job_ids[job - 1] = self._job_ids[moved_job - 1]
+            self._job_ids.pop()
+
+        numbers = {job_id: k + 1 for k, job_id in enumerate(self._job_ids)}
+        self._update_solutions()
+        self.solution.sequence = [numbers[job_id] for job_id in pending_ids]
+        self.solution.calculate_objective()
+        return started_ids
+
+    def improve(self, runtime_in_miliseconds=None):
+        """Run Iterated Greedy from the live schedule for a bounded time.
+
+        With fewer pending jobs than the jobs removed by Iterated Greedy,
+        only the insertion local search is applied.
+
+        Arguments:
+            runtime_in_miliseconds: Time limit (default: time_slice).
+
+        Returns:
+            objective_value: Objective value of the live schedule.
+        """
+        ig = self.iterated_greedy
+        runtime = self.time_slice if runtime_in_miliseconds is None else runtime_in_miliseconds
+        self.solution.objective = ig.objective
+        if len(self.solution.sequence) > ig.num_jobs_remove:
+            ig.run(runtime, initial_sequence=self.solution.sequence.copy())
+        elif len(self.solution.sequence) > 1:
+            local_search.insertion_neighborhood(self.solution, ig.local_optimum, ig.tie_breaking)
+        return self.solution.objective_value
+
+    def _update_solutions(self):
+        """Update the Iterated Greedy solutions after the instance changed."""
+        ig = self.iterated_greedy
+        for solution in (ig.current_solution, ig.new_solution, ig.best_solution):
+            solution.update_instance()
+            solution.objective = ig.objective
+            solution.release_times = self.release_times
@@ -0,0 +1,91 @@
+"""
+permutation-flowshop repository
+
+Statistics collected by Iterated Greedy runs with instrumentation
+enabled (time per phase, kernel calls, acceptance and best value trace).
+"""
+
+from collections import Counter
+
+# Phases of an iteration, in order
+PHASES = ('destruction', 'partial_local_search', 'construction', 'local_search', 'acceptance')
+
+# Results of the acceptance phase
+IMPROVED = 'improved'
+ACCEPTED = 'accepted'
+REJECTED = 'rejected'
+
+class RunStatistics(object):
+    """Search progress of one IteratedGreedy run.
+
+    Attributes:
+        phase_times: Dict with the seconds spent in each phase (PHASES)
+        and in the initial solution.
+        kernel_calls: Counter with the number of calls to each compiled
+        function, shared by the solutions of the run.
+        iterations: Number of iterations in this run (int).
+        outcomes: Counter with the number of iterations where the new solution
+        was better than the current one (IMPROVED), was worse or equal but
+        accepted (ACCEPTED) or was rejected (REJECTED).
+        trace: List with (seconds, iteration, best objective value) for the
+        initial solution and each improvement of the best solution.
+        elapsed_seconds: Duration of the run (float).
+        cache: Dict with the statistics of the solution cache, if it was
+        used (see SolutionCache.as_dict).
+    """
+
+    def __init__(self):
+        self.kernel_calls = Counter()
+        self.iterations = 0
+        self.outcomes = Counter()
+        self.trace = list()
+        self.elapsed_seconds = 0.0
+        self.cache = None
+        # Nanoseconds per phase, the initial solution is the last element
+        self._phase_ns = [0] * (len(PHASES) + 1)
+
+    @property
+    def phase_times(self):
+        """Seconds spent in each phase (dict)."""
+        times = {phase: ns / 1e9 for phase, ns in zip(PHASES, self._phase_ns)}
+        times['initial_solution'] = self._phase_ns[-1] / 1e9
+        return times
+
+    @property
+    def acceptance_rate(self):
+        """Fraction of iterations where the new solution was accepted (float)."""
+        if self.iterations == 0:
+            return 0.0
+        return (self.outcomes[IMPROVED] + self.outcomes[ACCEPTED]) / self.iterations
+
+    @property
+    def rejection_rate(self):
+        """Fraction of iterations where the new solution was rejected (float)."""
+        if self.iterations == 0:
+            return 0.0
+        return self.outcomes[REJECTED] / self.iterations
+
+    def add_iteration(self, phase_ns, outcome):
+        """Add the nanoseconds of each phase (same order as PHASES) and the acceptance outcome."""
+        for i, ns in enumerate(phase_ns):
+            self._phase_ns[i] += ns
+        self.outcomes[outcome] += 1
+        self.iterations += 1
+
+    def add_initial_solution(self, ns):
+        """Add the nanoseconds spent building the initial solution."""
+        self._phase_ns[-1] += ns
+
+    def as_dict(self):
+        """Return the statistics as a dict of builtin types (e.g. for json)."""
+        return {
+            'iterations': self.iterations,
+            'elapsed_seconds': self.elapsed_seconds,
+            'phase_times': self.phase_times,
+            'kernel_calls': dict(self.kernel_calls),
+            'outcomes': {outcome: self.outcomes[outcome] for outcome in (IMPROVED, ACCEPTED, REJECTED)},
+            'acceptance_rate': self.acceptance_rate,
+            'rejection_rate': self.rejection_rate,
+            'trace': [list(point) for point in self.trace],
+            'cache': self.cache,
+        }
@@ -3,6 +3,9 @@ permutation-flowshop repository
 
 Selection methods for choosing the jobs that will be
 removed in the current iteration of Iterated Greedy.
+
+Jobs are selected without replacement. Random numbers are drawn
+with numpy (np.random) except for the tournament participants.
 """
 
 import random
@@ -11,6 +14,9 @@ import numpy as np
 def roulette_wheel(weights, num_jobs):
     """Apply Fitness Proportionate Selection based on weights.
 
+    Each draw is a binary search (np.searchsorted) on the cumulative
+    weights; jobs already chosen are drawn again.
+
     Arguments
         weights: numpy array with the weight for each job
         num_jobs: number of jobs to select
@@ -18,20 +24,19 @@ def roulette_wheel(weights, num_jobs):
     Returns
         chosen: List with the index of selected jobs.
     """
-    weights_sum = np.sum(weights)
+    cumulative_weights = np.cumsum(weights, dtype='float64')
+    if np.count_nonzero(weights) < num_jobs:
+        raise ValueError("not enough jobs with positive weight")
+
     chosen = []
-    for i in range(num_jobs):
-        # Get random value between 0 and total weight
-        random_num = random.random() * weights_sum
-        # Binary Search
-        for k in range(len(weights)):
-            random_num -= weights[k]
-            if random_num <= 0:
-                chosen.append(k+1)
-                break
-        else:
-            # Rounding errors: append last index
-            chosen.append(len(weights) - 1)
+    while len(chosen) < num_jobs:
+        # Get random values between 0 and total weight
+        random_nums = np.random.random(num_jobs - len(chosen)) * cumulative_weights[-1]
+        indexes = np.searchsorted(cumulative_weights, random_nums, side='right')
+        # Rounding errors: use last index
+        for k in np.minimum(indexes, len(weights) - 1).tolist():
+            if k + 1 not in chosen and len(chosen) < num_jobs:
+                chosen.append(k + 1)
     return chosen
 
 
@@ -46,33 +51,34 @@ def tournament_selection(weights, tournament_size, num_jobs):
     Returns
         chosen: List with the index of selected jobs.
     """
-    population = [k+1 for k in range(len(weights))]
+    population = np.arange(1, len(weights) + 1)
+    population_size = len(weights)
     chosen = []
 
     for tournament_count in range(num_jobs):
         # Select tournament participants from general population
-        aspirants = random.sample(population, tournament_size)
-
-        # Choose the best in tournament
-        best = -1
-        for asp in aspirants:
-            if weights[asp-1] > best:
-                best = weights[asp-1]
-                winner = asp
-
-        # Pick random if all jobs have 0 idle time
-        if best == 0:
-            winner = random.choice(aspirants)
-
-        # Add job to chosen list and remove from population
-        chosen.append(winner)
-        population.remove(winner)
+        positions = random.sample(range(population_size), tournament_size)
+        aspirants_weights = weights[population[positions] - 1]
+
+        # Choose the best in tournament (pick random if all jobs have 0 idle time)
+        best = int(np.argmax(aspirants_weights))
+        if aspirants_weights[best] <= 0:
+            best = random.randrange(tournament_size)
+        winner_position = positions[best]
+
+        # Add job to chosen list and remove from population (swap with last)
+        chosen.append(int(population[winner_position]))
+        population_size -= 1
+        population[winner_position] = population[population_size]
     return chosen
 
 
 def stochastic_universal_sampling(weights, num_jobs):
     """Apply Stochastic Universal Sampling to select jobs based on weights.
 
+    If a job is hit by more than one pointer, the remaining jobs are
+    selected with roulette_wheel among the jobs not chosen.
+
     Arguments
         weights: numpy array with the weight for each job
         num_jobs: number of jobs to select
@@ -80,19 +86,19 @@ def stochastic_universal_sampling(weights, num_jobs):
     Returns
         chosen: List with the index of selected jobs.
     """
+    cumulative_weights = np.cumsum(weights, dtype='float64')
     # Calculate points distance and random start
-    distance = np.sum(weights)/num_jobs
-    start = random.uniform(0, distance)
-
-    # List of pointers
-    points = [start + i*distance for i in range(num_jobs)]
-    # Get corresponding jobs
-    chosen = []
-    for p in points:
-        i = 0
-        _sum = weights[i]
-        while _sum < p:
-            i += 1
-            _sum += weights[i]
-        chosen.append(i+1)
+    distance = cumulative_weights[-1] / num_jobs
+    start = np.random.uniform(0, distance)
+
+    # Pointers and corresponding jobs
+    points = start + distance * np.arange(num_jobs)
+    indexes = np.searchsorted(cumulative_weights, points, side='right')
+    indexes = np.minimum(indexes, len(weights) - 1)
+    chosen = [k + 1 for k in dict.fromkeys(indexes.tolist())]
+
+    if len(chosen) < num_jobs:
+        remaining_weights = np.array(weights, dtype='float64')
+        remaining_weights[np.array(chosen) - 1] = 0
+        chosen += roulette_wheel(remaining_weights, num_jobs - len(chosen))
     return chosen
@@ -5,8 +5,15 @@ Class for holding solutions and connecting makespan calculations
 that are implemented in C (through Cython library).
 """
 
+import random
 import numpy as np
 from cysource import calculations
+from problem_instance import get_instance
+
+# Objective functions (Solution.objective)
+MAKESPAN = 0
+FLOWTIME = 1
+TARDINESS = 2
 
 class Solution(object):
     """Implements functions and data structures for the problem and solution.
@@ -17,71 +24,415 @@ class Solution(object):
     in the compiled Cython module. Makespan and idle time must be integers.
 
     Attributes:
+        instance: ProblemInstance with processing times and statistics; it
+        is created from the processing times if an array is given.
         num_jobs: Number of jobs to be sequenced (int).
         num_machines: Number of machines in the problem (int).
         makespan: Current makespan of the sequence (int, default: 0).
         idle_time: Current idle time between jobs (int, default: 0).
-        sequence: List with the current sequence of jobs
+        sequence: Numpy array with the current sequence of jobs
         idle_times: Numpy array with the idle time associated to each job.
+        num_threads: Threads used to evaluate insertion positions (int, default: 1).
+        evaluations: Number of makespan evaluations, where each insertion
+        position evaluated counts as one (int).
+        bound_pruning: Abandon insertion positions whose partial makespan
+        exceeds the best one and stop the local search at the instance
+        lower bound (boolean, default: False).
+        objective: Objective minimized by insert_best_position and the
+        insertion local search: MAKESPAN, FLOWTIME (total flowtime) or
+        TARDINESS (total weighted tardiness, requires the instance due
+        dates) (int, default: MAKESPAN). The other local searches and
+        insertion_makespans only support the makespan.
+        objective_value: Current value of the objective (int); the same as
+        makespan for the makespan objective.
+        release_times: Numpy array with the time each machine becomes
+        available, e.g. after jobs that already started (default: zeros).
+        kernel_calls: Counter (collections) incremented with the name of
+        each compiled function called, or None to not count (default: None).
     """
 
-    def __init__(self, instance_processing_times):
+    __slots__ = ('instance', 'num_jobs', 'num_machines', 'makespan', 'idle_time', 'processing_times',
+                 'idle_times', '_sequence', '_length', '_order', '_workspace', '_makespans',
+                 '_valid_heads', '_valid_tails', 'num_threads', 'evaluations', 'bound_pruning',
+                 'objective', '_objective_value', '_costs', 'kernel_calls')
+
+    def __init__(self, instance):
+        # Problem instance - shared with other objects
+        self.instance = get_instance(instance)
         # int variables
-        self.num_jobs = len(instance_processing_times)
-        self.num_machines = len(instance_processing_times[0])
+        self.num_jobs = self.instance.num_jobs
+        self.num_machines = self.instance.num_machines
         self.makespan = 0
         self.idle_time = 0
+        self.num_threads = 1
+        self.evaluations = 0
+        self.bound_pruning = False
+        self.objective = MAKESPAN
+        self._objective_value = 0
+        self.kernel_calls = None
 
-        # Current solution sequence - list object
-        self.sequence = list()
+        # Current solution sequence - preallocated numpy array with
+        # room for all jobs; only the first _length elements are used
+        self._length = 0
         # Processing times - numpy 2d array
-        self.processing_times = instance_processing_times
+        self.processing_times = self.instance.processing_times
+        self._allocate(self.instance.capacity)
+
+
+    def _allocate(self, capacity):
+        """Allocate the buffers with room for capacity jobs (keeps the sequence)."""
+        sequence = np.zeros(shape=(capacity), dtype='int32')
+        workspace = np.zeros(shape=(4, capacity + 2, self.num_machines + 2), dtype='int32')
+        if self._length > 0:
+            sequence[:self._length] = self._sequence[:self._length]
+            workspace[0, 0] = self._workspace[0, 0]
+        self._sequence = sequence
+        # Scratch array for the order of jobs in the local search
+        self._order = np.zeros(shape=(capacity), dtype='int32')
         # Idle times - numpy array
-        self.idle_times = np.zeros(shape=(self.num_jobs), dtype= 'int32')
+        self.idle_times = np.zeros(shape=(capacity), dtype= 'int32')
+        # Workspace for the Taillard acceleration (e, q, f and fl matrices) and
+        # makespan per insertion position - allocated once and reused
+        self._workspace = workspace
+        self._makespans = np.zeros(shape=(capacity + 2), dtype='int32')
+        # Prefix sums of the objective (flowtime and tardiness)
+        self._costs = np.zeros(shape=(capacity + 2), dtype='int64')
+        # Number of heads (from the first job) and tails (from the last job)
+        # rows in the workspace that are still valid for the current sequence
+        self._valid_heads = 0
+        self._valid_tails = 0
+
+
+    def update_instance(self):
+        """Update the solution after jobs were added to or removed from the instance.
+
+        The buffers only grow when the instance capacity does. The sequence is
+        kept; the caller must make it consistent with the new job numbers.
+        """
+        self.num_jobs = self.instance.num_jobs
+        self.processing_times = self.instance.processing_times
+        if self._sequence.shape[0] < self.instance.capacity:
+            self._allocate(self.instance.capacity)
+        self._valid_heads = 0
+        self._valid_tails = 0
+
+
+    @property
+    def release_times(self):
+        """Time each machine becomes available (copy of a numpy array)."""
+        return self._workspace[0, 0, 1:self.num_machines + 1].copy()
+
+
+    @release_times.setter
+    def release_times(self, release_times):
+        # Row 0 of the heads matrix (e) is used as the start of every sequence
+        self._workspace[0, 0, 1:self.num_machines + 1] = release_times
+        self._valid_heads = 0
+
+
+    @property
+    def sequence(self):
+        """Current sequence of jobs.
+
+        This is a view on the internal buffer (no copy) and must not be
+        changed in place; use remove_job and insert_best_position, or
+        assign a new sequence.
+        """
+        return self._sequence[:self._length]
+
+
+    @sequence.setter
+    def sequence(self, sequence):
+        length = len(sequence)
+        self._sequence[:length] = sequence
+        self._length = length
+        self._valid_heads = 0
+        self._valid_tails = 0
+
+
+    @property
+    def objective_value(self):
+        """Current value of the objective (the makespan by default)."""
+        if self.objective == MAKESPAN:
+            return self.makespan
+        return self._objective_value
+
+
+    @objective_value.setter
+    def objective_value(self, value):
+        if self.objective == MAKESPAN:
+            self.makespan = value
+        else:
+            self._objective_value = value
 
 
     def calculate_completion_times(self):
         """Calculate completion time."""
-        sequence_np = np.array(self.sequence, dtype='int32')
-        memory_view_object = calculations.calculate_completion_times(sequence_np, self.processing_times, self.num_machines, 1)
+        self._count('calculate_completion_times')
+        memory_view_object = calculations.calculate_completion_times(self._sequence[:self._length], self.processing_times, self.num_machines, 1,
+                                                                     self.release_times)
         return np.array(memory_view_object)
 
 
     def calculate_makespan(self):
         """Calculate makespan for the sequence."""
-        sequence_np = np.array(self.sequence, dtype='int32')
-        self.makespan = calculations.calculate_completion_times(sequence_np,self.processing_times,self.num_machines, 0)
+        self._count('calculate_heads')
+        self.makespan = calculations.calculate_heads(self._sequence[:self._length],self.processing_times,self.num_machines,
+                                                     self._workspace,self._valid_heads)
+        self._valid_heads = self._length
+        self.evaluations += 1
         return self.makespan
 
 
+    def calculate_objective(self):
+        """Calculate the objective value for the sequence (and the makespan)."""
+        if self.objective == MAKESPAN:
+            return self.calculate_makespan()
+
+        self._count('calculate_objective')
+        self._objective_value, self.makespan = calculations.calculate_objective\
+            (self._sequence[:self._length],self.processing_times,self.num_machines,self.objective,
+             self._due_dates(),self.instance.weights,self._workspace,self._valid_heads)
+        self._valid_heads = self._length
+        self.evaluations += 1
+        return self._objective_value
+
+
     def insert_best_position(self, job, tie_breaking=False):
         """ Insert the given job in the position that minimize makespan.
 
         Insert the job in the position at self.sequence that minimizes the
-        sequence makespan.
+        sequence makespan (or the objective, see objective attribute).
 
         Arguments
             job: Job to be inserted (int).
-            tie_breaking: Use tie breaking mechanism (boolean, default: False).
+            tie_breaking: Use tie breaking mechanism, only for the
+            makespan objective (boolean, default: False).
 
         Returns
-            makespan: Makespan after inserting the job.
+            value: Objective value (makespan) after inserting the job.
         """
+        if self.objective != MAKESPAN:
+            self._count('objective_insertion')
+            best_position, self._objective_value, self.makespan = calculations.objective_insertion\
+                (self._sequence[:self._length],self.processing_times,job,self.num_machines,self.objective,
+                 self._due_dates(),self.instance.weights,self._workspace,self._costs,self._valid_heads)
+            self.evaluations += self._length + 1
+            self._valid_heads = best_position - 1
+            self._valid_tails = min(self._valid_tails, self._length + 1 - best_position)
+            self._count('insert_job')
+            self._length = calculations.insert_job(self._sequence, self._length, best_position - 1, job)
+            return self._objective_value
+
         if tie_breaking:
             use_tie_breaking = 1
         else:
             use_tie_breaking = 0
 
-        sequence_np = np.array(self.sequence, dtype='int32')
+        self._count('taillard_acceleration')
         best_position, self.makespan = calculations.taillard_acceleration\
-            (sequence_np,self.processing_times,job,self.num_machines,use_tie_breaking)
+            (self._sequence[:self._length],self.processing_times,job,self.num_machines,use_tie_breaking,
+             self._workspace,self._makespans,self._valid_heads,self._valid_tails,self.num_threads,
+             int(self.bound_pruning))
+
+        self.evaluations += self._length + 1
+        # Heads before and tails after the new job are still valid
+        self._valid_heads = best_position - 1
+        self._valid_tails = self._length + 1 - best_position
+        self._count('insert_job')
+        self._length = calculations.insert_job(self._sequence, self._length, best_position - 1, job)
+        return self.makespan
+
+
+    def insertion_local_search(self, local_optimum=True, tie_breaking=False):
+        """Apply the insertion neighborhood local search (compiled).
+
+        Jobs are removed in random order and inserted in the best position,
+        until no improvement (local_optimum) or after a single pass. The seed
+        for the order of jobs is drawn from the random module.
+
+        Arguments
+            local_optimum: Repeat search until local opt (boolean, default: True).
+            tie_breaking: Use tie breaking mechanism, only for the
+            makespan objective (boolean, default: False).
+
+        Returns
+            value: Objective value (makespan) after the local search.
+        """
+        if self.objective != MAKESPAN:
+            self._count('objective_local_search')
+            self._objective_value, self.makespan, evaluations, self._valid_heads, self._valid_tails = \
+                calculations.objective_local_search\
+                (self._sequence,self._length,self.processing_times,self.num_machines,self.objective,
+                 self._due_dates(),self.instance.weights,int(local_optimum),self._workspace,self._costs,
+                 self._order,random.getrandbits(64),self._valid_heads)
+            self.evaluations += evaluations
+            return self._objective_value
+
+        self._count('insertion_local_search')
+        self.makespan, evaluations, self._valid_heads, self._valid_tails = calculations.insertion_local_search\
+            (self._sequence,self._length,self.processing_times,self.num_machines,int(tie_breaking),
+             int(local_optimum),self._workspace,self._makespans,self._order,random.getrandbits(64),
+             self._valid_heads,self._valid_tails,self.num_threads,int(self.bound_pruning),self._lower_bound())
+        self.evaluations += evaluations
+        return self.makespan
+
+
+    def reference_local_search(self, reference, tie_breaking=False):
+        """Apply the reference (RZ) local search (compiled).
 
-        self.sequence.insert(best_position - 1, job)
+        Jobs are removed in the order of the reference sequence (cyclically)
+        and inserted in the best position, until a full cycle without improvement.
+
+        Arguments
+            reference: Sequence with the same jobs, e.g. the best solution.
+            tie_breaking: Use tie breaking mechanism (boolean, default: False).
+
+        Returns
+            makespan: Makespan after the local search.
+        """
+        self._check_makespan_objective()
+        reference_np = np.array(reference, dtype='int32')
+        self._count('reference_local_search')
+        self.makespan, evaluations, self._valid_heads, self._valid_tails = calculations.reference_local_search\
+            (self._sequence,self._length,self.processing_times,self.num_machines,int(tie_breaking),
+             reference_np,self._workspace,self._makespans,self._valid_heads,self._valid_tails,
+             self.num_threads,int(self.bound_pruning),self._lower_bound())
+        self.evaluations += evaluations
         return self.makespan
 
 
+    def swap_local_search(self, local_optimum=True):
+        """Apply the swap neighborhood local search (compiled, first improvement).
+
+        Arguments
+            local_optimum: Repeat search until local opt (boolean, default: True).
+
+        Returns
+            makespan: Makespan after the local search.
+        """
+        self._check_makespan_objective()
+        self._count('swap_local_search')
+        self.makespan, evaluations, self._valid_heads, self._valid_tails = calculations.swap_local_search\
+            (self._sequence,self._length,self.processing_times,self.num_machines,int(local_optimum),
+             self._workspace,self._valid_heads,self._valid_tails,self._lower_bound())
+        self.evaluations += evaluations
+        return self.makespan
+
+
+    def block_local_search(self, block_size=2, local_optimum=True):
+        """Apply the block insertion neighborhood local search (compiled).
+
+        Each run of block_size consecutive jobs is moved to the position
+        that minimizes the makespan. The sequence is unchanged if block_size
+        is not smaller than its length.
+
+        Arguments
+            block_size: Number of consecutive jobs moved together (int, default: 2).
+            local_optimum: Repeat search until local opt (boolean, default: True).
+
+        Returns
+            makespan: Makespan after the local search.
+        """
+        self._check_makespan_objective()
+        self._count('block_local_search')
+        self.makespan, evaluations, self._valid_heads, self._valid_tails = calculations.block_local_search\
+            (self._sequence,self._length,self.processing_times,self.num_machines,block_size,
+             int(local_optimum),self._workspace,self._makespans,self._order,self._valid_heads,
+             self._valid_tails,self._lower_bound())
+        self.evaluations += evaluations
+        return self.makespan
+
+
+    def _lower_bound(self):
+        """Lower bound where the local search stops (0 when disabled)."""
+        # The instance lower bound is only valid for complete sequences
+        if self.bound_pruning and self._length == self.num_jobs and self.objective == MAKESPAN:
+            return self.instance.lower_bound
+        return 0
+
+
+    def _count(self, kernel):
+        """Count a call to a compiled function (if kernel_calls is set)."""
+        if self.kernel_calls is not None:
+            self.kernel_calls[kernel] += 1
+
+
+    def _check_makespan_objective(self):
+        """Raise ValueError if the objective is not the makespan."""
+        if self.objective != MAKESPAN:
+            raise ValueError("this method is only available for the makespan objective")
+
+
+    def _due_dates(self):
+        """Due dates for the compiled functions (not used by the flowtime objective)."""
+        if self.objective == TARDINESS and self.instance.due_dates is None:
+            raise ValueError("the tardiness objective requires the instance due dates")
+        return self.instance.due_dates
+
+
+    def insertion_makespans(self, jobs):
+        """Return the makespan of inserting each job in each position.
+
+        Heads and tails of the current sequence are computed only once
+        for all candidate jobs. The sequence is not changed.
+
+        Arguments
+            jobs: List or numpy array with candidate jobs (not in the sequence).
+
+        Returns
+            makespans: Numpy 2d array with shape (len(jobs), len(sequence) + 1);
+            element [k, i] is the makespan with jobs[k] inserted at index i.
+        """
+        self._check_makespan_objective()
+        jobs_np = np.asarray(jobs, dtype='int32')
+        self._count('insertion_makespans')
+        makespans = calculations.insertion_makespans(self._sequence[:self._length],self.processing_times,jobs_np,
+                                                     self.num_machines,self._workspace,self._valid_heads,
+                                                     self._valid_tails,self.num_threads)
+        self._valid_heads = self._length
+        self._valid_tails = self._length
+        self.evaluations += makespans.size
+        return makespans
+
+
+    def insert_job(self, job, position):
+        """Insert the given job at an index of the sequence.
+
+        The makespan is not updated (see insertion_makespans and calculate_makespan).
+
+        Arguments
+            job: Job to be inserted (int).
+            position: Index of the job in the new sequence (int).
+        """
+        self._valid_heads = min(self._valid_heads, position)
+        self._valid_tails = min(self._valid_tails, self._length - position)
+        self._count('insert_job')
+        self._length = calculations.insert_job(self._sequence, self._length, position, job)
+
+
+    def remove_job(self, job):
+        """Remove the given job from the sequence.
+
+        Arguments
+            job: Job to be removed (int).
+
+        Returns
+            position: Index of the job in the sequence before removal.
+        """
+        self._count('remove_job')
+        position = calculations.remove_job(self._sequence, self._length, job)
+        if position < 0:
+            raise ValueError("job {} is not in the sequence".format(job))
+        self._valid_heads = min(self._valid_heads, position)
+        self._valid_tails = min(self._valid_tails, self._length - position - 1)
+        self._length -= 1
+        return position
+
+
     def calculate_idle_times(self):
         """Calculate the idle time wrt each job and saves in self.idle_time."""
-        sequence_np = np.array(self.sequence, dtype='int32')
-        memory_view_object = calculations.calculate_idle_times(sequence_np,self.processing_times,self.num_machines)
-        self.idle_time = np.array(memory_view_object)
\ No newline at end of file
+        self._count('calculate_idle_times')
+        memory_view_object = calculations.calculate_idle_times(self._sequence[:self._length],self.processing_times,self.num_machines,
+                                                             self.release_times)
+        self.idle_time = np.array(memory_view_object)
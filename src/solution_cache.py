@@ -0,0 +1,94 @@
+"""
+permutation-flowshop repository
+
+Bounded cache with the local search result of sequences already
+visited by Iterated Greedy, keyed by a Zobrist hash of the sequence.
+"""
+
+from collections import OrderedDict
+import numpy as np
+
+# Seed of the Zobrist keys (the global random generators are not used,
+# so enabling the cache does not change the random numbers of the run)
+ZOBRIST_SEED = 20190101
+
+class SolutionCache(object):
+    """Least recently used cache: sequence -> local optimum and its values.
+
+    The hash of a sequence is the xor of one random 64 bit key for each
+    (position, job) pair (Zobrist hashing). The sequence is also stored and
+    compared on lookup, so a hash collision is a miss and never returns the
+    result of another sequence.
+
+    The hash is computed from scratch once per lookup with a single numpy
+    reduction instead of being updated with each removal and insertion of
+    the destruction and construction phases: an incremental update costs a
+    few Python calls per move, which is slower than the vectorized hash for
+    the small instances where sequences are revisited often.
+
+    Attributes:
+        num_jobs: Number of jobs of the sequences (int).
+        max_size: Maximum number of sequences (int).
+        hits: Number of lookups that found the sequence (int).
+        misses: Number of lookups that did not (int).
+    """
+
+    def __init__(self, num_jobs, max_size):
+        if max_size < 1:
+            raise ValueError("the cache must have room for at least one sequence")
+        self.num_jobs = num_jobs
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        generator = np.random.default_rng(ZOBRIST_SEED)
+        self._keys = generator.integers(0, np.iinfo('uint64').max, size=num_jobs * num_jobs,
+                                        dtype='uint64', endpoint=True)
+        # Index of the key for job 1 at each position
+        self._offsets = np.arange(num_jobs, dtype='int64') * num_jobs - 1
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups that found the sequence (float)."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def hash(self, sequence):
+        """Return the Zobrist hash of a complete sequence (int)."""
+        return int(np.bitwise_xor.reduce(self._keys[self._offsets + sequence]))
+
+    def get(self, key, sequence):
+        """Return (local optimum, objective value, makespan) for the sequence or None.
+
+        Arguments:
+            key: Hash of the sequence (see hash).
+            sequence: Numpy int32 array with the sequence.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != sequence.tobytes():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1:]
+
+    def put(self, key, sequence, local_optimum, objective_value, makespan):
+        """Store the local search result of a sequence, removing the least recently used if full."""
+        self._entries[key] = (sequence.tobytes(), local_optimum.copy(), objective_value, makespan)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all sequences and reset the statistics."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self):
+        """Return the statistics as a dict of builtin types (e.g. for json)."""
+        return {'size': len(self), 'max_size': self.max_size, 'hits': self.hits,
+                'misses': self.misses, 'hit_rate': self.hit_rate}
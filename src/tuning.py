@@ -0,0 +1,327 @@
+"""
+permutation-flowshop repository
+
+Tune the Iterated Greedy parameters for each instance class (jobs x
+machines) with racing (F-race). Example (from the src directory):
+
+    python tuning.py taillard --workers 4 --runtime-parameter 30
+        --parameters '{"temperature_param": [0.2, 0.4], "num_jobs_remove": [2, 4, 6]}'
+"""
+
+import argparse
+import itertools
+import json
+import math
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from benchmark_runner import INSTANCE_SETS
+from iterated_greedy import computational_time
+from parallel_iterated_greedy import solve_batch
+from problem_instance import get_instance
+
+def grid(parameters):
+    """Return all combinations of the parameter values (full factorial design).
+
+    Arguments:
+        parameters: Dict with IteratedGreedy attribute -> list of values.
+
+    Returns:
+        configurations: Ordered dict with configuration name -> dict of attributes.
+    """
+    names = sorted(parameters)
+    configurations = OrderedDict()
+    for values in itertools.product(*(parameters[name] for name in names)):
+        configuration = dict(zip(names, values))
+        key = ",".join("{}={}".format(name, value) for name, value in configuration.items())
+        configurations[key] = configuration
+    return configurations
+
+
+def tune(instances, configurations, runtime_parameter=30, runtime_in_miliseconds=None, min_blocks=5,
+         max_blocks=None, alpha=0.05, workers=None, seed=0):
+    """Race the configurations separately on each instance class.
+
+    A race runs the surviving configurations on one instance of the class
+    at a time (a block; all configurations get the same seed). After
+    min_blocks blocks, a Friedman test on the makespan ranks is done after
+    each block; if it rejects that all configurations are equivalent, the
+    configurations significantly worse than the best one are discarded
+    (Conover post-hoc test, as in F-race). A race ends with one survivor or
+    after max_blocks blocks. The races of all classes advance together and
+    their runs share one process pool, so the workers stay busy.
+
+    Arguments:
+        instances: List with ProblemInstance objects or processing times.
+        configurations: Dict with configuration name -> dict of IteratedGreedy
+        attributes (see grid).
+        runtime_parameter: Parameter for computational_time (int, default: 30).
+        runtime_in_miliseconds: Fixed runtime of each run; None to use
+        computational_time (default: None).
+        min_blocks: Blocks before the first test (int, default: 5).
+        max_blocks: Maximum blocks of a race; instances are repeated with new
+        seeds when a class has fewer instances (default: instances in the class).
+        alpha: Significance level of the tests (float, default: 0.05).
+        workers: Number of processes (int, default: number of cores).
+        seed: Seed of the first block, incremented for each block (int, default: 0).
+
+    Returns:
+        results: List with a dict for each class: instance_class, best
+        (configuration name), configuration, survivors (names by mean rank),
+        mean_ranks (of the survivors), blocks and runs.
+    """
+    classes = OrderedDict()
+    for instance in instances:
+        instance = get_instance(instance)
+        classes.setdefault((instance.num_jobs, instance.num_machines), list()).append(instance)
+    races = [_Race(instance_class, class_instances, configurations, min_blocks,
+                   max_blocks if max_blocks else len(class_instances), alpha, seed)
+             for instance_class, class_instances in classes.items()]
+
+    pool = None if workers == 1 else ProcessPoolExecutor(max_workers=workers)
+    try:
+        active = [race for race in races if not race.finished]
+        while active:
+            tasks = list()
+            for race in active:
+                instance, block_seed = race.next_block()
+                for name in race.survivors:
+                    tasks.append((race, name, instance, block_seed))
+
+            if runtime_in_miliseconds is None:
+                runtimes = [computational_time(task[2].num_jobs, task[2].num_machines, runtime_parameter)
+                            for task in tasks]
+            else:
+                runtimes = [runtime_in_miliseconds] * len(tasks)
+            makespans = dict()
+            batch = solve_batch([task[2] for task in tasks], runtimes, workers=workers,
+                                seeds=[task[3] for task in tasks],
+                                configurations=[configurations[task[1]] for task in tasks], pool=pool)
+            for result in batch:
+                race, name = tasks[result['index']][:2]
+                makespans.setdefault(race, dict())[name] = result['makespan']
+
+            for race in active:
+                race.add_block(makespans[race])
+            active = [race for race in active if not race.finished]
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    return [race.result() for race in races]
+
+
+class _Race(object):
+    """Racing state of one instance class (see tune)."""
+
+    def __init__(self, instance_class, instances, configurations, min_blocks, max_blocks, alpha, seed):
+        self.instance_class = instance_class
+        self.instances = instances
+        self.configurations = configurations
+        self.min_blocks = min_blocks
+        self.max_blocks = max_blocks
+        self.alpha = alpha
+        self.seed = seed
+        self.survivors = list(configurations)
+        self.runs = 0
+        # Makespan of each configuration in each block (eliminated ones stop growing)
+        self.costs = OrderedDict((name, list()) for name in configurations)
+        self.blocks = 0
+
+    @property
+    def finished(self):
+        return len(self.survivors) == 1 or self.blocks >= self.max_blocks
+
+    def next_block(self):
+        """Return the instance and seed of the next block."""
+        return self.instances[self.blocks % len(self.instances)], self.seed + self.blocks
+
+    def add_block(self, makespans):
+        """Add the makespans of the survivors in the last block and discard inferior ones."""
+        for name in self.survivors:
+            self.costs[name].append(makespans[name])
+        self.runs += len(self.survivors)
+        self.blocks += 1
+        if self.blocks >= self.min_blocks and len(self.survivors) > 1:
+            self.survivors = _race_step(self._survivor_costs(), self.survivors, self.alpha)
+
+    def result(self):
+        """Return the best configuration and the survivors of the race (see tune)."""
+        if self.blocks == 0:
+            # Single configuration, the race did not run
+            mean_ranks = np.ones(len(self.survivors))
+        else:
+            mean_ranks = _ranks(self._survivor_costs()).mean(axis=0)
+        order = np.argsort(mean_ranks, kind='stable')
+        survivors = [self.survivors[i] for i in order]
+        return {
+            'instance_class': "{}x{}".format(*self.instance_class),
+            'best': survivors[0],
+            'configuration': self.configurations[survivors[0]],
+            'survivors': survivors,
+            'mean_ranks': [float(mean_ranks[i]) for i in order],
+            'blocks': self.blocks,
+            'runs': self.runs,
+        }
+
+    def _survivor_costs(self):
+        """Return a 2d array (blocks x survivors) with the makespans."""
+        return np.array([self.costs[name] for name in self.survivors], dtype='float64').T
+
+
+def _race_step(costs, names, alpha):
+    """Friedman test on the costs (blocks x configurations) and Conover post-hoc test.
+
+    Reference:
+    "A Racing Algorithm for Configuring Metaheuristics", Birattari, M.,
+    Stutzle, T., Paquete, L. and Varrentrapp, K., GECCO (2002), p11-18.
+
+    Returns:
+        survivors: List with the names not significantly worse than the best.
+    """
+    num_blocks, num_configurations = costs.shape
+    ranks = _ranks(costs)
+    rank_sums = ranks.sum(axis=0)
+    a = (ranks ** 2).sum()
+    c = num_blocks * num_configurations * (num_configurations + 1) ** 2 / 4
+    if a == c:
+        # Same ranks in every block (all ties)
+        return names
+
+    statistic = (num_configurations - 1) * ((rank_sums ** 2).sum() - num_blocks * c) / (a - c)
+    if statistic <= _chi2_quantile(1 - alpha, num_configurations - 1):
+        return names
+
+    degrees = (num_blocks - 1) * (num_configurations - 1)
+    difference = _t_quantile(1 - alpha / 2, degrees) * math.sqrt(
+        2 * num_blocks * (a - (rank_sums ** 2).sum() / num_blocks) / degrees)
+    best = rank_sums.min()
+    return [name for name, rank_sum in zip(names, rank_sums) if rank_sum - best <= difference]
+
+
+def _ranks(costs):
+    """Rank the configurations in each block (row), with the mean rank for ties."""
+    ranks = np.empty(costs.shape, dtype='float64')
+    for i, row in enumerate(costs):
+        order = np.argsort(row, kind='stable')
+        _, first, counts = np.unique(row[order], return_index=True, return_counts=True)
+        sorted_ranks = np.repeat(first + (counts + 1) / 2, counts)
+        ranks[i, order] = sorted_ranks
+    return ranks
+
+
+def _chi2_quantile(p, degrees):
+    """Quantile of the chi-square distribution."""
+    return _inverse_cdf(lambda x: _regularized_gamma(degrees / 2, x / 2), p)
+
+
+def _t_quantile(p, degrees):
+    """Quantile of the Student t distribution (p >= 0.5)."""
+    return _inverse_cdf(lambda t: 1 - _regularized_beta(degrees / 2, 0.5, degrees / (degrees + t * t)) / 2, p)
+
+
+def _inverse_cdf(cdf, p):
+    """Return x >= 0 with cdf(x) = p for an increasing cdf (bisection)."""
+    low, high = 0.0, 1.0
+    while cdf(high) < p:
+        low, high = high, 2 * high
+    for _ in range(100):
+        middle = (low + high) / 2
+        if cdf(middle) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def _regularized_gamma(a, x):
+    """Regularized lower incomplete gamma function P(a, x).
+
+    Series for x < a + 1 and continued fraction otherwise, see
+    Numerical Recipes, section 6.2.
+    """
+    if x <= 0:
+        return 0.0
+    factor = math.exp(a * math.log(x) - x - math.lgamma(a))
+    if x < a + 1:
+        term = total = 1 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return total * factor
+    return 1 - factor / _continued_fraction(lambda i: -i * (i - a), lambda i: x + 2 * i + 1 - a)
+
+
+def _regularized_beta(a, b, x):
+    """Regularized incomplete beta function I_x(a, b), see Numerical Recipes, section 6.4."""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1 - _regularized_beta(b, a, 1 - x)
+    factor = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) +
+                      a * math.log(x) + b * math.log(1 - x))
+
+    def numerator(i):
+        m = i // 2
+        if i % 2 == 0:
+            return m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m))
+        return -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))
+    return factor / a / _continued_fraction(numerator, lambda i: 1.0)
+
+
+def _continued_fraction(numerator, denominator):
+    """Evaluate b(0) + a(1) / (b(1) + a(2) / (b(2) + ...)) with the modified Lentz method."""
+    tiny = 1e-300
+    value = c = denominator(0) or tiny
+    d = 0.0
+    for i in range(1, 1000):
+        d = denominator(i) + numerator(i) * d
+        d = 1 / (d or tiny)
+        c = denominator(i) + numerator(i) / c
+        c = c or tiny
+        value *= c * d
+        if abs(c * d - 1) < 1e-15:
+            break
+    return value
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Tune Iterated Greedy parameters by racing.")
+    parser.add_argument('instance_set', choices=sorted(INSTANCE_SETS))
+    parser.add_argument('--parameters', default='{"temperature_param": [0.2, 0.4, 0.6], "num_jobs_remove": [2, 4, 6]}',
+                        help="json (or json file) with IteratedGreedy attribute -> list of values")
+    parser.add_argument('--runtime-parameter', type=int, default=30,
+                        help="parameter for the literature time limit (n * m / 2 * parameter ms)")
+    parser.add_argument('--runtime', type=float, default=None, help="fixed runtime in miliseconds")
+    parser.add_argument('--min-blocks', type=int, default=5, help="instances before the first test")
+    parser.add_argument('--max-blocks', type=int, default=None, help="maximum instances of a race")
+    parser.add_argument('--alpha', type=float, default=0.05, help="significance level")
+    parser.add_argument('--workers', type=int, default=0, help="number of processes (0 for all cores)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cache-file', default=None, help="npz cache for the instance set")
+    parser.add_argument('--output', default='tuning_results.json', help="json output file")
+    args = parser.parse_args(argv)
+
+    import_function, _ = INSTANCE_SETS[args.instance_set]
+    instances = import_function(cache_file=args.cache_file)
+    if args.parameters.strip().startswith('{'):
+        parameters = json.loads(args.parameters)
+    else:
+        with open(args.parameters) as f:
+            parameters = json.load(f)
+
+    results = tune(instances, grid(parameters), args.runtime_parameter, args.runtime, args.min_blocks,
+                   args.max_blocks, args.alpha, args.workers if args.workers > 0 else None, args.seed)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    for result in results:
+        print("{instance_class}: {best} ({blocks} blocks, {runs} runs, {survivors_count} survivors)".format(
+            survivors_count=len(result['survivors']), **result))
+
+
+if __name__ == "__main__":
+    main()
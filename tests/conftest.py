@@ -0,0 +1,10 @@
+"""
+permutation-flowshop repository
+
+The modules are in src and import each other by name.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
@@ -0,0 +1,44 @@
+"""
+permutation-flowshop repository
+
+Tests for the branch and bound, against brute force on small instances.
+"""
+
+import itertools
+import numpy as np
+import branch_and_bound
+from batch_evaluation import evaluate_sequences
+from branch_and_bound import BranchAndBound
+
+
+def _optimal_makespan(processing_times):
+    num_jobs = processing_times.shape[0]
+    sequences = np.array(list(itertools.permutations(range(1, num_jobs + 1))))
+    return evaluate_sequences(processing_times, sequences).min()
+
+
+def test_matches_brute_force_and_bounds_hold_when_stopped(monkeypatch):
+    # Resume the compiled search every few nodes
+    monkeypatch.setattr(branch_and_bound, 'CLOCK_CHECK_NODES', 7)
+    rng = np.random.default_rng(5)
+    for _ in range(40):
+        num_jobs, num_machines = int(rng.integers(2, 9)), int(rng.integers(1, 6))
+        processing_times = rng.integers(1, 60, (num_jobs, num_machines))
+        optimal_makespan = _optimal_makespan(processing_times)
+
+        bb = BranchAndBound(processing_times)
+        bb.incumbent_runtime = 0
+        assert bb.solve()
+        assert bb.best_solution.makespan == optimal_makespan == bb.lower_bound
+
+        # Stopped early: the lower bound comes from the unexplored nodes
+        for node_limit in (0, 1, 3, 10, 30, 100):
+            bb = BranchAndBound(processing_times)
+            bb.incumbent_runtime = 0
+            bb.node_limit = node_limit
+            optimal = bb.solve()
+            assert bb.nodes <= node_limit
+            assert bb.lower_bound <= optimal_makespan <= bb.best_solution.makespan
+            assert optimal == (bb.lower_bound == bb.best_solution.makespan)
+            sequence = bb.best_solution.sequence.reshape(1, -1)
+            assert evaluate_sequences(processing_times, sequence)[0] == bb.best_solution.makespan
@@ -0,0 +1,33 @@
+"""
+permutation-flowshop repository
+
+Tests for the ProblemInstance class.
+"""
+
+import numpy as np
+from problem_instance import ProblemInstance
+
+
+def test_add_and_remove_jobs_match_a_new_instance():
+    rng = np.random.default_rng(0)
+    instance = ProblemInstance(rng.integers(1, 99, (5, 4)), capacity=6)
+    expected = instance.processing_times.tolist()
+    for _ in range(300):
+        if instance.num_jobs == 0 or rng.random() < 0.55:
+            new_jobs = rng.integers(1, 99, (rng.integers(1, 4), 4))
+            instance.add_jobs(new_jobs)
+            expected += new_jobs.tolist()
+        else:
+            # The last job takes the place of the removed one
+            job = int(rng.integers(1, instance.num_jobs + 1))
+            instance.remove_job(job)
+            expected[job - 1] = expected[-1]
+            expected.pop()
+
+        fresh = ProblemInstance(np.array(expected).reshape(-1, 4))
+        assert (instance.processing_times == fresh.processing_times).all()
+        assert (instance.total_processing_times == fresh.total_processing_times).all()
+        assert np.allclose(instance.mean_processing_times, fresh.mean_processing_times)
+        assert np.allclose(instance.std_processing_times, fresh.std_processing_times)
+        assert (instance.machine_loads == fresh.machine_loads).all()
+        assert instance.lower_bound == fresh.lower_bound
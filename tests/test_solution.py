@@ -0,0 +1,75 @@
+"""
+permutation-flowshop repository
+
+Tests for the Solution class.
+"""
+
+import numpy as np
+from solution import Solution
+
+
+def test_completion_and_idle_times_start_at_release_times():
+    rng = np.random.default_rng(0)
+    solution = Solution(rng.integers(1, 99, (10, 5)))
+    solution.sequence = rng.permutation(10).astype('int32') + 1
+    release_times = np.array([40, 0, 150, 90, 300], dtype='int32')
+    solution.release_times = release_times
+
+    solution.calculate_makespan()
+    completion_times = solution.calculate_completion_times()
+    assert completion_times[-1, -1] == solution.makespan
+    assert (completion_times[0, 1:] == release_times).all()
+
+    # Idle time: start of each job minus the time the machine became available
+    solution.calculate_idle_times()
+    times = solution.processing_times[solution.sequence - 1]
+    idle_times = (completion_times[1:, 1:] - times - completion_times[:-1, 1:]).sum(axis=1)
+    assert (solution.idle_time[solution.sequence - 1] == idle_times).all()
+    assert (idle_times >= 0).all()
+
+
+def _heads(sequence, processing_times):
+    """Completion times of the sequence, with a zero first row and column."""
+    heads = np.zeros((len(sequence) + 1, processing_times.shape[1] + 1), dtype='int64')
+    for i, job in enumerate(sequence, 1):
+        for j in range(1, processing_times.shape[1] + 1):
+            heads[i, j] = max(heads[i, j - 1], heads[i - 1, j]) + processing_times[job - 1, j - 1]
+    return heads
+
+
+def _tie_breaking_position(sequence, processing_times, job):
+    """Position (from 1) chosen by the idle time tie breaking, from the full schedules."""
+    e = _heads(sequence, processing_times)
+    schedules = [_heads(sequence[:i - 1] + [job] + sequence[i - 1:], processing_times)
+                 for i in range(1, len(sequence) + 2)]
+    best_makespan = min(schedule[-1, -1] for schedule in schedules)
+    best_position, best_idle_time = None, None
+    for i, schedule in enumerate(schedules, 1):
+        if schedule[-1, -1] != best_makespan:
+            continue
+        f = schedule[i]
+        if i == len(sequence) + 1:
+            idle_time = (f[1:] - e[i - 1, 1:] - processing_times[job - 1]).sum()
+        else:
+            # New completion times of the job after the inserted one
+            fl = schedule[i + 1]
+            times = processing_times[sequence[i - 1] - 1]
+            idle_time = sum(f[j] - e[i, j] + times[j - 1] - processing_times[job - 1, j - 1]
+                            + max(fl[j - 1] - f[j], 0) for j in range(2, len(f)))
+        if best_idle_time is None or idle_time < best_idle_time:
+            best_position, best_idle_time = i, idle_time
+    return best_position
+
+
+def test_tie_breaking_follows_the_jobs_of_the_sequence():
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        num_jobs, num_machines = int(rng.integers(3, 9)), int(rng.integers(2, 5))
+        # Small processing times, so many positions have the same makespan
+        processing_times = rng.integers(1, 4, (num_jobs + 1, num_machines))
+        sequence = (rng.permutation(num_jobs) + 1).tolist()
+        solution = Solution(processing_times)
+        solution.sequence = np.array(sequence, dtype='int32')
+        solution.insert_best_position(num_jobs + 1, tie_breaking=True)
+        position = solution.sequence.tolist().index(num_jobs + 1) + 1
+        assert position == _tie_breaking_position(sequence, solution.processing_times, num_jobs + 1)